@@ -0,0 +1,657 @@
+"""Application factory shared by main.py and main_simple.py
+
+``create_app(config)`` builds the core prediction API and then attaches the
+frontends named in ``config.frontends``:
+
+- ``"html"``: the pre-rendered website pages at ``/``, ``/predictor`` and ``/about``
+- ``"gradio"``: the Gradio UI at ``/gradio``, built on its first request
+
+Frontend modules are imported only when their frontend is enabled, so an
+API-only worker never loads gradio or the page templates.
+"""
+import hmac
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException, Path, Query, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from starlette.routing import Mount, Route
+
+import wire_format
+from comparables import DEFAULT_REFERENCE_PATH, ComparablesIndex
+from executor import BoundedExecutor, ExecutorFull
+from fast_json import PredictionEncoder
+from heatmap import DEFAULT_TILE_CACHE_DIR, MAX_TILE_ZOOM, PRICE_RANGE, TileRenderer
+from metrics import Metrics, MetricsMiddleware, cache_collector, model_collector
+from microbatch import MicroBatcher
+from model import PRICE_SCALE
+from model_registry import DEFAULT_ARTIFACT_PATH, ModelArtifactError, ModelRegistry
+from prediction_cache import PredictionCache
+from streaming import (
+    CSV_MEDIA_TYPES, NDJSON_MEDIA_TYPES, BodyStreamingResponse, stream_predictions
+)
+from validation import FEATURE_RANGES, FeatureValidator, ValidationFailed
+
+# Largest k accepted by /comparables
+MAX_COMPARABLES = 100
+
+# Most points returned by one /predict/sweep curve
+MAX_SWEEP_STEPS = 1000
+
+# Explanations are rounded to cents, which keeps batch responses short
+CONTRIBUTION_DECIMALS = 2
+
+
+def env_flag(name, default):
+    """Read a boolean environment variable; "0", "false", "no" and "" are false"""
+    return os.environ.get(name, default).lower() not in ("0", "false", "no", "")
+
+
+class AppConfig:
+    """Settings for create_app; ``from_env`` reads the documented environment variables"""
+
+    def __init__(self, artifact_path=DEFAULT_ARTIFACT_PATH, frontends=(),
+                 model_watch_interval=0.0, admin_token=None,
+                 batch_inline_max_rows=1000, batch_workers=2, batch_queue_size=8,
+                 stream_chunk_rows=10000, microbatch_max_wait_ms=0.0, microbatch_max_size=256,
+                 prediction_cache_size=0, prediction_cache_ttl=300.0, fast_json=False,
+                 reference_data_path=DEFAULT_REFERENCE_PATH, tile_cache_dir=DEFAULT_TILE_CACHE_DIR):
+        self.artifact_path = artifact_path
+        self.frontends = tuple(frontends)
+        self.model_watch_interval = model_watch_interval
+        self.admin_token = admin_token
+        self.batch_inline_max_rows = batch_inline_max_rows
+        self.batch_workers = batch_workers
+        self.batch_queue_size = batch_queue_size
+        self.stream_chunk_rows = stream_chunk_rows
+        self.microbatch_max_wait_ms = microbatch_max_wait_ms
+        self.microbatch_max_size = microbatch_max_size
+        self.prediction_cache_size = prediction_cache_size
+        self.prediction_cache_ttl = prediction_cache_ttl
+        self.fast_json = fast_json
+        self.reference_data_path = reference_data_path
+        self.tile_cache_dir = tile_cache_dir
+
+    @classmethod
+    def from_env(cls, frontends=()):
+        """Build a config from environment variables
+
+        ``frontends`` is the entry point's default; a comma-separated
+        FRONTENDS variable (e.g. ``html,gradio`` or empty) overrides it.
+        """
+        if "FRONTENDS" in os.environ:
+            frontends = [name.strip() for name in os.environ["FRONTENDS"].split(",") if name.strip()]
+        return cls(
+            artifact_path=os.environ.get("MODEL_ARTIFACT_PATH", DEFAULT_ARTIFACT_PATH),
+            frontends=frontends,
+            model_watch_interval=float(os.environ.get("MODEL_WATCH_INTERVAL", 0)),
+            admin_token=os.environ.get("ADMIN_TOKEN"),
+            batch_inline_max_rows=int(os.environ.get("BATCH_INLINE_MAX_ROWS", 1000)),
+            batch_workers=int(os.environ.get("BATCH_WORKERS", 2)),
+            batch_queue_size=int(os.environ.get("BATCH_QUEUE_SIZE", 8)),
+            stream_chunk_rows=int(os.environ.get("STREAM_CHUNK_ROWS", 10000)),
+            microbatch_max_wait_ms=float(os.environ.get("MICROBATCH_MAX_WAIT_MS", 0)),
+            microbatch_max_size=int(os.environ.get("MICROBATCH_MAX_SIZE", 256)),
+            prediction_cache_size=int(os.environ.get("PREDICTION_CACHE_SIZE", 0)),
+            prediction_cache_ttl=float(os.environ.get("PREDICTION_CACHE_TTL", 300)),
+            fast_json=env_flag("FAST_JSON", "0"),
+            reference_data_path=os.environ.get("REFERENCE_DATA_PATH", DEFAULT_REFERENCE_PATH),
+            tile_cache_dir=os.environ.get("TILE_CACHE_DIR", DEFAULT_TILE_CACHE_DIR),
+        )
+
+
+class PredictionService:
+    """The model, caches and worker pools behind one app, shared by its routes and frontends"""
+
+    def __init__(self, config):
+        self.config = config
+
+        # Model loaded once from the exported artifact (see model_registry.py). It can
+        # be swapped live; handlers take registry.current() once per request.
+        self.registry = ModelRegistry(config.artifact_path)
+
+        # Feature names for reference (a swapped-in model must keep the same order)
+        self.feature_names = list(self.registry.current().feature_names)
+
+        # Shape, finiteness and plausible-range checks for every input row
+        self.validator = FeatureValidator(self.feature_names)
+
+        # Batches up to batch_inline_max_rows rows are scored on the event loop; larger
+        # ones go to a bounded pool, and requests beyond its workers plus queue get a 503
+        self.batch_executor = BoundedExecutor(
+            max_workers=config.batch_workers, max_queue=config.batch_queue_size
+        )
+
+        # Optional micro-batching of concurrent /predict calls
+        self.micro_batcher = None
+        if config.microbatch_max_wait_ms > 0:
+            self.micro_batcher = MicroBatcher(
+                max_wait=config.microbatch_max_wait_ms / 1000,
+                max_batch_size=config.microbatch_max_size,
+            )
+
+        # In-process LRU cache of single-row predictions, cleared whenever the model
+        # is swapped
+        self.cache = None
+        if config.prediction_cache_size > 0:
+            self.cache = PredictionCache(
+                maxsize=config.prediction_cache_size, ttl=config.prediction_cache_ttl
+            )
+            self.registry.add_swap_listener(self.cache.clear)
+
+        # Reference properties for /comparables, indexed by location once per process
+        # (before forking under gunicorn). Optional: without the file the route answers 503.
+        self.comparables = None
+        if config.reference_data_path and os.path.exists(config.reference_data_path):
+            self.comparables = ComparablesIndex.load(config.reference_data_path)
+
+        # Heatmap tiles, rendered once per model version into a disk cache shared by
+        # all workers; held features come from the reference set when there is one
+        self.tiles = TileRenderer(
+            config.tile_cache_dir,
+            reference_features=self.comparables.features if self.comparables is not None else None,
+            feature_names=self.feature_names,
+        )
+
+    def predict_house_price_simple(self, features, model=None):
+        """Simple linear prediction without scikit-learn dependency"""
+        if model is None:
+            model = self.registry.current()
+        if self.cache is None:
+            return model.predict(features)
+
+        prediction = self.cache.get(model, features)
+        if prediction is None:
+            prediction = model.predict(features)
+            self.cache.put(model, features, prediction)
+        return prediction
+
+    async def predict_micro_batched(self, features, model):
+        """Like predict_house_price_simple, but coalesced with concurrent requests"""
+        if self.cache is None:
+            return await self.micro_batcher.submit(model, features)
+
+        prediction = self.cache.get(model, features)
+        if prediction is None:
+            prediction = await self.micro_batcher.submit(model, features)
+            self.cache.put(model, features, prediction)
+        return prediction
+
+    async def predict_one(self, features, model):
+        if self.micro_batcher is not None:
+            return await self.predict_micro_batched(features, model)
+        return self.predict_house_price_simple(features, model)
+
+    def build_feature_matrix(self, rows=None, columns=None):
+        """Pack row lists or feature-name-keyed columns into one validated float64 matrix"""
+        n_features = len(self.feature_names)
+        if rows is not None:
+            self.validator.check_row_lengths(rows)
+            X = np.empty((len(rows), n_features), dtype=np.float64)
+            # NumPy reads [] as shape (0,), which does not broadcast to (0, n_features)
+            if rows:
+                X[...] = rows
+            self.validator.check_matrix(X, loc=("body", "rows"))
+            return X
+
+        self.validator.check_columns(columns)
+        n_rows = len(columns[self.feature_names[0]])
+        X = np.empty((n_rows, n_features), dtype=np.float64)
+        for j, name in enumerate(self.feature_names):
+            X[:, j] = columns[name]
+        self.validator.check_matrix(X, loc=("body", "columns"))
+        return X
+
+    def sweep(self, base, feature, values, model):
+        """Predictions for base with one feature replaced by each of values, in one pass
+
+        Returns (base prediction, swept predictions).
+        """
+        j = self.feature_names.index(feature)
+        X = np.empty((len(values) + 1, len(base)), dtype=np.float64)
+        X[:] = base
+        X[1:, j] = values
+        try:
+            self.validator.check_matrix(X[1:], loc=("body", "values"))
+        except ValidationFailed as e:
+            # Only the swept column can fail, so drop the column index from each loc
+            for error in e.errors:
+                del error["loc"][-1]
+            raise
+        predictions = model.predict_matrix(X)
+        return predictions[0], predictions[1:]
+
+    def score_batch(self, rows, columns, model, explain=False):
+        """Build the feature matrix and score it, returning (predictions, contributions) as lists
+
+        Contributions are only computed, in the same pass, when ``explain`` is set.
+        """
+        X = self.build_feature_matrix(rows=rows, columns=columns)
+        if not explain:
+            return model.predict_matrix(X).tolist(), None
+        predictions, contributions = model.predict_matrix_explained(X)
+        return predictions.tolist(), contributions.round(CONTRIBUTION_DECIMALS).tolist()
+
+
+class Input(BaseModel):
+    data: Optional[List[float]] = [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]
+
+class BatchInput(BaseModel):
+    rows: Optional[List[List[float]]] = None
+    columns: Optional[Dict[str, List[float]]] = None
+
+
+class SweepInput(BaseModel):
+    data: Optional[List[float]] = [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]
+    feature: str
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: int = 50
+    values: Optional[List[float]] = None
+
+
+def _queue_full():
+    return HTTPException(
+        status_code=503,
+        detail="Batch queue is full, retry later",
+        headers={"Retry-After": "1"},
+    )
+
+
+def add_core_routes(app, service, metrics):
+    """The prediction API itself, served by every entry point"""
+    config = service.config
+    feature_names = service.feature_names
+    registry = service.registry
+    validator = service.validator
+
+    # Opt-in fast /predict serialization from pre-encoded fragments, bypassing
+    # FastAPI's jsonable_encoder
+    encoder = PredictionEncoder(feature_names) if config.fast_json else None
+
+    @app.exception_handler(ValidationFailed)
+    async def validation_failed_handler(request: Request, exc: ValidationFailed):
+        return JSONResponse(status_code=422, content=exc.to_dict())
+
+    @app.on_event("startup")
+    def start_model_watcher():
+        if config.model_watch_interval > 0:
+            registry.start_watching(config.model_watch_interval)
+
+    @app.on_event("shutdown")
+    def stop_batch_executor():
+        service.batch_executor.shutdown()
+
+    @app.post("/predict")
+    async def predict(input: Input = Input(), compact: bool = False, explain: bool = False):
+        """Predict one house price
+
+        `?compact=1` returns only the prediction and model version. `?explain=1`
+        adds each term's contribution (coef * value, in dollars) in `terms`
+        order, plus the intercept they sum with. The terms are the feature
+        names followed by any features the model's transforms derive.
+        """
+        validator.check_row(input.data)
+        model = registry.current()
+        explanation = None
+        if explain:
+            # The prediction is the row sum of the contributions, from the same pass
+            predictions, contributions = model.predict_matrix_explained(np.array([input.data], dtype=np.float64))
+            prediction = float(predictions[0])
+            explanation = {
+                "terms": list(model.term_names),
+                "contributions": contributions[0].round(CONTRIBUTION_DECIMALS).tolist(),
+                "intercept": model.intercept * PRICE_SCALE,
+            }
+        else:
+            prediction = await service.predict_one(input.data, model)
+
+        if encoder is not None and explanation is None:
+            return Response(
+                content=encoder.encode(model, prediction, input.data, compact),
+                media_type="application/json",
+            )
+        if compact:
+            response = {"prediction": float(prediction), "model_version": model.version}
+        else:
+            response = {
+                "prediction": float(prediction),
+                "prediction_formatted": f"${prediction:,.2f}",
+                "input_features": input.data,
+                "feature_names": feature_names,
+                "model_version": model.version
+            }
+        if explanation is not None:
+            response.update(explanation)
+        return response
+
+    @app.post("/predict/batch")
+    async def predict_batch(input: BatchInput, explain: bool = False):
+        """Score many rows at once, given as `rows` or as `columns` keyed by feature name
+
+        `?explain=1` adds a `contributions` row per input row, in `terms` order.
+        """
+        if (input.rows is None) == (input.columns is None):
+            raise ValidationFailed([{
+                "loc": ["body"],
+                "msg": "Provide exactly one of 'rows' or 'columns'",
+                "type": "value_error.missing",
+            }])
+
+        model = registry.current()
+        if input.rows is not None:
+            n_rows = len(input.rows)
+        else:
+            n_rows = max((len(values) for values in input.columns.values()), default=0)
+        metrics.observe_batch_size(n_rows)
+
+        try:
+            if n_rows <= config.batch_inline_max_rows:
+                predictions, contributions = service.score_batch(
+                    input.rows, input.columns, model, explain
+                )
+            else:
+                predictions, contributions = await service.batch_executor.run(
+                    service.score_batch, input.rows, input.columns, model, explain
+                )
+        except ExecutorFull:
+            raise _queue_full()
+
+        response = {
+            "predictions": predictions,
+            "count": len(predictions),
+            "feature_names": feature_names,
+            "model_version": model.version
+        }
+        if explain:
+            response["terms"] = list(model.term_names)
+            response["contributions"] = contributions
+            response["intercept"] = model.intercept * PRICE_SCALE
+        return response
+
+    @app.post("/predict/sweep")
+    async def predict_sweep(input: SweepInput):
+        """Vary one feature of a base row over a range and return the whole price curve
+
+        Give either explicit `values`, or `start`, `stop` and `steps` (the range
+        defaults to the feature's plausible range). Also returns each term's
+        linear contribution to the base prediction.
+        """
+        validator.check_row(input.data)
+        if input.feature not in feature_names:
+            raise ValidationFailed([{
+                "loc": ["body", "feature"],
+                "msg": f"Unknown feature {input.feature!r}, expected one of {feature_names}",
+                "type": "value_error.feature",
+            }])
+        if input.values is not None:
+            values = np.asarray(input.values, dtype=np.float64)
+        else:
+            low, high = FEATURE_RANGES.get(input.feature, (None, None))
+            start = input.start if input.start is not None else low
+            stop = input.stop if input.stop is not None else high
+            if start is None or stop is None:
+                raise ValidationFailed([{
+                    "loc": ["body"], "msg": "Provide 'start' and 'stop' or 'values'",
+                    "type": "value_error.missing",
+                }])
+            if not 2 <= input.steps <= MAX_SWEEP_STEPS:
+                raise ValidationFailed([{
+                    "loc": ["body", "steps"], "msg": f"steps must be between 2 and {MAX_SWEEP_STEPS}",
+                    "type": "value_error.range",
+                }])
+            # Every value lies between start and stop, so the ends are the ones to report
+            for field, value in (("start", start), ("stop", stop)):
+                validator.check_value(input.feature, value, loc=("body", field))
+            values = np.linspace(start, stop, input.steps)
+        if not 1 <= len(values) <= MAX_SWEEP_STEPS:
+            raise ValidationFailed([{
+                "loc": ["body", "values"], "msg": f"Provide between 1 and {MAX_SWEEP_STEPS} values",
+                "type": "value_error.range",
+            }])
+
+        model = registry.current()
+        base_prediction, predictions = service.sweep(input.data, input.feature, values, model)
+        contributions = model.contributions(input.data)
+        return {
+            "feature": input.feature,
+            "values": values.tolist(),
+            "predictions": predictions.tolist(),
+            "base_prediction": float(base_prediction),
+            "contributions": dict(zip(model.term_names, contributions.tolist())),
+            "intercept": model.intercept * PRICE_SCALE,
+            "feature_names": feature_names,
+            "model_version": model.version
+        }
+
+    @app.post("/predict/binary")
+    async def predict_binary(request: Request):
+        """Score a binary float32/float64 matrix (see wire_format.py), returning raw float64"""
+        body = await request.body()
+        model = registry.current()
+        try:
+            X = wire_format.decode_matrix(body, model.n_features)
+            validator.check_matrix(X, loc=("body",))
+            metrics.observe_batch_size(len(X))
+            if len(X) <= config.batch_inline_max_rows:
+                predictions = model.predict_matrix(X)
+            else:
+                predictions = await service.batch_executor.run(model.predict_matrix, X)
+        except wire_format.WireFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except ExecutorFull:
+            raise _queue_full()
+
+        return Response(
+            content=wire_format.encode_vector(predictions),
+            media_type=wire_format.MEDIA_TYPE,
+            headers={"X-Model-Version": model.version},
+        )
+
+    @app.post("/predict/stream")
+    async def predict_stream(request: Request):
+        """Score an NDJSON or CSV body of any size, streaming results back per chunk
+
+        A bad header or first chunk gets a 422; later failures end the stream
+        with an error line.
+        """
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type in CSV_MEDIA_TYPES:
+            is_csv, media_type = True, "text/csv"
+        elif content_type in NDJSON_MEDIA_TYPES:
+            is_csv, media_type = False, "application/x-ndjson"
+        else:
+            raise HTTPException(
+                status_code=415,
+                detail="Send text/csv or application/x-ndjson",
+            )
+
+        model = registry.current()
+        # Raises ValidationFailed (a 422) if the header or first chunk is bad. Chunks
+        # are scored on the batch pool, so a full pool gets a 503 like /predict/batch.
+        try:
+            output = await stream_predictions(
+                request.stream(), model, feature_names, is_csv, config.stream_chunk_rows,
+                service.batch_executor, validator,
+            )
+        except ExecutorFull:
+            raise _queue_full()
+        return BodyStreamingResponse(
+            output,
+            media_type=media_type,
+            headers={"X-Model-Version": model.version},
+        )
+
+    @app.get("/comparables")
+    async def get_comparables(
+        latitude: float = Query(..., ge=FEATURE_RANGES["Latitude"][0], le=FEATURE_RANGES["Latitude"][1]),
+        longitude: float = Query(..., ge=FEATURE_RANGES["Longitude"][0], le=FEATURE_RANGES["Longitude"][1]),
+        k: int = Query(10, ge=1, le=MAX_COMPARABLES),
+    ):
+        """The k reference properties nearest to a location, with their features and values"""
+        if service.comparables is None:
+            raise HTTPException(status_code=503, detail="No reference dataset loaded")
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "comparables": service.comparables.nearest(latitude, longitude, k),
+        }
+
+    @app.get("/tiles/{z}/{x}/{y}.png")
+    async def get_tile(request: Request, z: int = Path(..., ge=0, le=MAX_TILE_ZOOM),
+                       x: int = Path(..., ge=0), y: int = Path(..., ge=0), percentile: float = 50):
+        """Heatmap tile of predicted prices, other features held at `percentile`"""
+        if x >= 2 ** z or y >= 2 ** z:
+            raise HTTPException(status_code=404, detail=f"No tile {z}/{x}/{y}")
+        model = registry.current()
+        try:
+            # A cheap membership check; baselines are computed on the pool in tiles.get
+            percentile = service.tiles.check_percentile(percentile)
+        except ValueError as e:
+            raise ValidationFailed([{
+                "loc": ["query", "percentile"], "msg": str(e), "type": "value_error.range",
+            }])
+
+        headers = {
+            "ETag": f'"{model.version}-{service.tiles.baseline_id}-p{percentile}"',
+            "Cache-Control": "public, max-age=86400",
+            "X-Model-Version": model.version,
+            "X-Price-Range": f"{PRICE_RANGE[0]:g}-{PRICE_RANGE[1]:g}",
+        }
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        try:
+            png = await service.batch_executor.run(service.tiles.get, model, z, x, y, percentile)
+        except ExecutorFull:
+            raise _queue_full()
+        return Response(content=png, media_type="image/png", headers=headers)
+
+    @app.get("/metrics")
+    async def get_metrics():
+        """Prometheus metrics for this worker"""
+        return metrics.response()
+
+    @app.get("/cache/stats")
+    async def cache_stats():
+        """Hit, miss and eviction counters for the prediction cache"""
+        if service.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **service.cache.stats()}
+
+    @app.post("/admin/model/reload")
+    def reload_model(x_admin_token: Optional[str] = Header(None)):
+        """Reload the model artifact from disk and swap it in without a restart
+
+        Only the worker that receives this call swaps; set MODEL_WATCH_INTERVAL
+        to have every worker pick up a new artifact on its own.
+        """
+        # Constant-time comparison; bytes, since compare_digest rejects non-ASCII str
+        supplied = (x_admin_token or "").encode("utf-8")
+        if not config.admin_token or not hmac.compare_digest(supplied, config.admin_token.encode("utf-8")):
+            raise HTTPException(status_code=403, detail="Admin token required")
+        try:
+            previous = registry.reload()
+        except ModelArtifactError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return {
+            "model_version": registry.current().version,
+            "previous_version": previous.version
+        }
+
+
+def add_status_route(app, service):
+    """JSON status at / for apps without the HTML homepage"""
+    @app.get("/")
+    def read_root():
+        return {
+            "message": "House Price Prediction API",
+            "status": "running",
+            "model": "Simple Linear Regression (no scikit-learn dependency)",
+            "model_version": service.registry.current().version,
+        }
+
+
+def add_html_pages(app, service):
+    """Website pages, rendered and compressed once when the app is built"""
+    from html_pages import ABOUT_HTML, HOME_HTML, PREDICTOR_HTML
+    from precompressed import PrecompressedPage
+
+    home_page = PrecompressedPage(HOME_HTML)
+    predictor_page = PrecompressedPage(PREDICTOR_HTML)
+    about_page = PrecompressedPage(ABOUT_HTML)
+
+    @app.get("/")
+    async def read_root(request: Request):
+        """Website homepage with navigation"""
+        return home_page.response(request)
+
+    @app.get("/predictor")
+    async def get_predictor(request: Request):
+        """Price Predictor Page"""
+        return predictor_page.response(request)
+
+    @app.get("/about")
+    async def get_about(request: Request):
+        """About Page"""
+        return about_page.response(request)
+
+
+def add_gradio_ui(app, service):
+    """Gradio UI at /gradio, imported and built on its first request"""
+    from lazy_app import LazyASGIApp
+
+    def build_gradio_app():
+        from gradio_ui import create_gradio_app
+
+        return create_gradio_app(service.predict_house_price_simple, service.validator)
+
+    gradio_app = LazyASGIApp(build_gradio_app)
+    app.mount("/gradio", gradio_app)
+    app.add_event_handler("shutdown", gradio_app.shutdown)
+
+
+FRONTENDS = {
+    "html": add_html_pages,
+    "gradio": add_gradio_ui,
+}
+
+
+def create_app(config=None):
+    """Build the API with the frontends named in config.frontends"""
+    if config is None:
+        config = AppConfig.from_env()
+    unknown = [name for name in config.frontends if name not in FRONTENDS]
+    if unknown:
+        raise ValueError(f"Unknown frontends {unknown}, expected some of {sorted(FRONTENDS)}")
+
+    app = FastAPI(title="House Price Prediction API", version="1.0.0")
+    service = PredictionService(config)
+    app.state.service = service
+
+    # Per-worker request, latency and batch-size metrics, served at /metrics. Route
+    # labels are filled in below, once every route is registered.
+    metrics = Metrics(routes=())
+    metrics.add_collector(model_collector(service.registry))
+    if service.cache is not None:
+        metrics.add_collector(cache_collector(service.cache))
+    app.state.metrics = metrics
+
+    add_core_routes(app, service, metrics)
+    if "html" not in config.frontends:
+        add_status_route(app, service)
+    for name in config.frontends:
+        FRONTENDS[name](app, service)
+
+    # Routes with path parameters are labelled by their static prefix, e.g. /tiles
+    metrics.routes = frozenset(
+        route.path for route in app.routes if isinstance(route, Route) and "{" not in route.path
+    )
+    metrics.prefix_routes = tuple(
+        [route.path.split("{")[0].rstrip("/") for route in app.routes
+         if isinstance(route, Route) and "{" in route.path]
+        + [route.path for route in app.routes if isinstance(route, Mount)]
+    )
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    return app
@@ -0,0 +1,226 @@
+"""Score a file of feature rows offline with the same model as /predict
+
+Supported inputs:
+
+- ``.csv``: one row per line, optionally with a header naming the feature
+  columns (extra columns are ignored)
+- ``.npy``: a (n_rows, n_features) float32 or float64 array, memory-mapped
+- ``.f32`` / ``.f64``: a raw little-endian (n_rows, n_features) matrix, memory-mapped
+- a directory of ``<FeatureName>.npy`` column files, memory-mapped
+- ``.parquet``: read by row group when pyarrow is installed
+
+Work is split across a process pool and predictions are written in input
+row order, either as ``.npy`` (float64) or ``.csv``.
+
+    python batch_score.py portfolio.npy predictions.npy --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
+
+from model_registry import DEFAULT_ARTIFACT_PATH, load_artifact
+from streaming import csv_usecols, parse_csv_chunk
+
+RAW_DTYPES = {".f32": "<f4", ".f64": "<f8"}
+
+# Per-process state, set up once by the pool initializer
+_model = None
+_source = None
+
+
+def open_source(path, n_features):
+    """Open an array-like input as (kind, handle, n_rows) without reading it"""
+    ext = os.path.splitext(path)[1].lower()
+    if os.path.isdir(path):
+        return "columns", path, None
+    if ext == ".npy":
+        X = np.load(path, mmap_mode="r")
+        if X.ndim != 2 or X.shape[1] != n_features:
+            raise ValueError(f"Expected a (n_rows, {n_features}) array, got {X.shape}")
+        return "array", X, X.shape[0]
+    if ext in RAW_DTYPES:
+        X = np.memmap(path, dtype=RAW_DTYPES[ext], mode="r")
+        if X.size % n_features:
+            raise ValueError(f"{path} does not hold a whole number of {n_features}-feature rows")
+        return "array", X.reshape(-1, n_features), X.size // n_features
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+
+        metadata = pq.ParquetFile(path).metadata
+        return "parquet", path, metadata.num_rows
+    if ext == ".csv":
+        return "csv", path, None
+    raise ValueError(f"Unsupported input format: {path}")
+
+
+def open_columns(path, feature_names):
+    """Memory-map a directory of per-feature .npy column files"""
+    columns = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in feature_names]
+    n_rows = len(columns[0])
+    for name, column in zip(feature_names, columns):
+        if column.ndim != 1 or len(column) != n_rows:
+            raise ValueError(f"Column {name} has shape {column.shape}, expected ({n_rows},)")
+    return columns, n_rows
+
+
+def _init_worker(model_path, input_path):
+    global _model, _source
+    _model = load_artifact(model_path)
+    feature_names = list(_model.feature_names)
+    kind, handle, _ = open_source(input_path, _model.n_features)
+    if kind == "columns":
+        handle, _ = open_columns(handle, feature_names)
+    _source = (kind, handle, feature_names)
+
+
+def _score_task(task):
+    kind, handle, feature_names = _source
+    if kind == "array":
+        start, stop = task
+        X = np.asarray(handle[start:stop], dtype=np.float64)
+    elif kind == "columns":
+        start, stop = task
+        X = np.column_stack([column[start:stop] for column in handle]).astype(np.float64, copy=False)
+    elif kind == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.ParquetFile(handle).read_row_group(task, columns=feature_names)
+        X = np.column_stack([table.column(name).to_numpy() for name in feature_names])
+        X = X.astype(np.float64, copy=False)
+    else:
+        lines, usecols = task
+        X = parse_csv_chunk(lines, usecols)
+    return _model.predict_matrix(X)
+
+
+def iter_csv_tasks(path, feature_names, chunk_rows):
+    """Yield (lines, usecols) chunks of a CSV file, skipping its header if present"""
+    usecols = list(range(len(feature_names)))
+    lines = []
+    with open(path, "rb") as f:
+        first = True
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if first:
+                first = False
+                header_cols = csv_usecols(line, feature_names)
+                if header_cols is not None:
+                    usecols = header_cols
+                    continue
+            lines.append(line)
+            if len(lines) >= chunk_rows:
+                yield lines, usecols
+                lines = []
+    if lines:
+        yield lines, usecols
+
+
+def count_csv_rows(path, feature_names):
+    n_rows = 0
+    with open(path, "rb") as f:
+        first = True
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if first:
+                first = False
+                if csv_usecols(line, feature_names) is not None:
+                    continue
+            n_rows += 1
+    return n_rows
+
+
+class PredictionWriter:
+    """Writes predictions in order to a preallocated .npy or a streamed .csv"""
+
+    def __init__(self, path, n_rows):
+        self.path = path
+        self.offset = 0
+        if path.lower().endswith(".npy"):
+            self._out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(n_rows,))
+            self._csv = None
+        elif path.lower().endswith(".csv"):
+            self._out = None
+            self._csv = open(path, "w")
+            self._csv.write("prediction\n")
+        else:
+            raise ValueError(f"Unsupported output format: {path}")
+
+    def write(self, predictions):
+        if self._out is not None:
+            self._out[self.offset:self.offset + len(predictions)] = predictions
+        else:
+            self._csv.write("".join([f"{p!r}\n" for p in predictions.tolist()]))
+        self.offset += len(predictions)
+
+    def close(self):
+        if self._out is not None:
+            self._out.flush()
+            del self._out
+        else:
+            self._csv.close()
+
+
+def score_file(input_path, output_path, model_path=DEFAULT_ARTIFACT_PATH,
+               workers=None, chunk_rows=200000):
+    """Score input_path into output_path, returning the number of rows written"""
+    model = load_artifact(model_path)
+    feature_names = list(model.feature_names)
+    kind, handle, n_rows = open_source(input_path, model.n_features)
+
+    if kind == "columns":
+        _, n_rows = open_columns(handle, feature_names)
+    if kind == "csv":
+        tasks = iter_csv_tasks(input_path, feature_names, chunk_rows)
+        if output_path.lower().endswith(".npy"):
+            n_rows = count_csv_rows(input_path, feature_names)
+    elif kind == "parquet":
+        import pyarrow.parquet as pq
+
+        tasks = range(pq.ParquetFile(input_path).num_row_groups)
+    else:
+        tasks = ((start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows))
+
+    workers = workers or os.cpu_count() or 1
+    writer = PredictionWriter(output_path, n_rows)
+    try:
+        with Pool(workers, initializer=_init_worker, initargs=(model_path, input_path)) as pool:
+            # Results are collected in submission order, so output rows match input
+            # rows. At most two tasks per worker are in flight, which keeps memory
+            # flat for CSV input where each task carries its lines.
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.apply_async(_score_task, (task,)))
+                if len(pending) >= 2 * workers:
+                    writer.write(pending.popleft().get())
+            while pending:
+                writer.write(pending.popleft().get())
+    finally:
+        writer.close()
+    return writer.offset
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a file of house feature rows")
+    parser.add_argument("input", help="Input .csv, .npy, .f32/.f64, .parquet or column directory")
+    parser.add_argument("output", help="Output .npy or .csv")
+    parser.add_argument("--model", default=DEFAULT_ARTIFACT_PATH, help="Model artifact (.npz)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--chunk-rows", type=int, default=200000, help="Rows per task")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        n_rows = score_file(args.input, args.output, args.model, args.workers, args.chunk_rows)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    elapsed = time.perf_counter() - started
+    print(f"Scored {n_rows:,} rows in {elapsed:.1f}s -> {args.output}")
@@ -0,0 +1,257 @@
+"""HTTP load test for the API: throughput and p50/p95/p99 latency per scenario
+
+Runs each scenario at a fixed concurrency with an async client and writes
+the results as JSON, so runs can be compared for regressions:
+
+    python benchmark_api.py --spawn --concurrency 64 --duration 10 --output before.json
+    python benchmark_api.py --spawn --concurrency 64 --duration 10 --compare before.json
+
+Targets:
+
+- ``--spawn`` starts ``main:app`` through serve.py on a free local port (default)
+- ``--url http://host:port`` drives an already running server
+- ``--in-process`` calls the ASGI app directly, without sockets
+
+Needs ``httpx`` (``pip install httpx``), which the API itself does not use.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import wire_format
+
+EXAMPLE_ROW = [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]
+
+
+def make_scenarios(batch_rows):
+    """Scenario name -> (method, path, request kwargs)"""
+    rows = [EXAMPLE_ROW] * batch_rows
+    binary_body = wire_format.encode_matrix(np.array(rows, dtype=np.float64))
+    return {
+        "predict": ("POST", "/predict", {"json": {"data": EXAMPLE_ROW}}),
+        "predict_compact": ("POST", "/predict?compact=1", {"json": {"data": EXAMPLE_ROW}}),
+        "predict_batch": ("POST", "/predict/batch", {"json": {"rows": rows}}),
+        "predict_binary": ("POST", "/predict/binary", {
+            "content": binary_body,
+            "headers": {"Content-Type": wire_format.MEDIA_TYPE},
+        }),
+        "home": ("GET", "/", {"headers": {"Accept-Encoding": "gzip, br"}}),
+        "predictor": ("GET", "/predictor", {"headers": {"Accept-Encoding": "gzip, br"}}),
+        "about": ("GET", "/about", {"headers": {"Accept-Encoding": "gzip, br"}}),
+    }
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_scenario(client, method, path, kwargs, concurrency, duration, warmup):
+    """Drive one scenario with `concurrency` workers for `duration` seconds"""
+    latencies = []
+    errors = 0
+    status_counts = {}
+    deadline = None
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                await response.aread()
+                status = response.status_code
+            except Exception:
+                status = "error"
+            elapsed = time.perf_counter() - started
+            if recording:
+                latencies.append(elapsed)
+                status_counts[status] = status_counts.get(status, 0) + 1
+                if status != 200:
+                    errors += 1
+
+    recording = False
+    deadline = time.perf_counter() + warmup
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+    recording = True
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_counts": {str(k): v for k, v in status_counts.items()},
+        "throughput_rps": len(latencies) / wall,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000 if latencies else None,
+            "p95": percentile(latencies, 95) * 1000 if latencies else None,
+            "p99": percentile(latencies, 99) * 1000 if latencies else None,
+            "max": latencies[-1] * 1000 if latencies else None,
+        },
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(app, port, workers):
+    """Start app the way production does: serve.run, so gunicorn for several workers"""
+    cmd = [sys.executable, "-c", f"import serve; serve.run({app!r})"]
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    process = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("server did not start within 60 seconds")
+
+
+def format_ms(value):
+    """A latency for the summary line; None when no request succeeded"""
+    return "n/a" if value is None else f"{value:.2f} ms"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print per-scenario deltas against a baseline; return names that regressed"""
+    regressions = []
+    # Spawned servers get a fresh port each run, so only compare the kind of target
+    if (baseline.get("target") == "in-process") != (results["target"] == "in-process"):
+        print(f"\nWarning: baseline target was {baseline.get('target')}, this run is {results['target']}")
+    if baseline.get("config") != results["config"]:
+        print(f"\nWarning: baseline config {baseline.get('config')} differs from {results['config']}")
+    print(f"\n{'scenario':<18}{'rps':>12}{'Δrps':>9}{'p99 ms':>10}{'Δp99':>9}")
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None or not current["requests"] or not previous["requests"]:
+            continue
+        rps_delta = current["throughput_rps"] / previous["throughput_rps"] - 1
+        p99_delta = current["latency_ms"]["p99"] / previous["latency_ms"]["p99"] - 1
+        flag = ""
+        if rps_delta < -threshold or p99_delta > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<18}{current['throughput_rps']:>12.0f}{rps_delta:>+9.1%}"
+              f"{current['latency_ms']['p99']:>10.2f}{p99_delta:>+9.1%}{flag}")
+    return regressions
+
+
+async def main(args):
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("benchmark_api.py needs httpx: pip install httpx")
+
+    process = None
+    if args.in_process:
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://benchmark")
+        target = "in-process"
+    else:
+        url = args.url
+        if url is None:
+            port = free_port()
+            process = spawn_server(args.app, port, args.workers)
+            url = f"http://127.0.0.1:{port}"
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=url, limits=limits, timeout=30)
+        target = url
+
+    scenarios = make_scenarios(args.batch_rows)
+    selected = args.scenarios or list(scenarios)
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "target": target,
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "batch_rows": args.batch_rows,
+            "workers": args.workers,
+        },
+        "scenarios": {},
+    }
+
+    try:
+        for name in selected:
+            method, path, kwargs = scenarios[name]
+            result = await run_scenario(
+                client, method, path, kwargs, args.concurrency, args.duration, args.warmup
+            )
+            results["scenarios"][name] = result
+            latency = "  ".join(f"{q} {format_ms(result['latency_ms'][q])}" for q in ("p50", "p95", "p99"))
+            print(f"{name:<18}{result['throughput_rps']:>10.0f} req/s  {latency}  errors {result['errors']}")
+    finally:
+        await client.aclose()
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            sys.exit(f"\nRegressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the house price API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Benchmark a running server at this base URL")
+    target.add_argument("--in-process", action="store_true", help="Call the ASGI app directly")
+    target.add_argument("--spawn", action="store_true", help="Start a local server with serve.py (default)")
+    parser.add_argument("--app", default="main:app", help="ASGI app for --spawn")
+    parser.add_argument("--workers", type=int, default=1, help="WEB_CONCURRENCY for --spawn; above 1 runs gunicorn")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unrecorded seconds per scenario")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="Rows per batch request")
+    parser.add_argument("--scenarios", nargs="+", choices=list(make_scenarios(1)))
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative throughput drop or p99 rise that counts as a regression")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,232 @@
+"""Micro-benchmarks for the prediction kernel, without HTTP
+
+Times every scoring variant over batch sizes from 1 to 10^7 rows in float32
+and float64, reporting ns/row and the peak memory of one call (as traced by
+tracemalloc), then prints where the NumPy paths overtake the scalar one:
+
+    python benchmark_kernel.py --output kernel_baseline.json
+    python benchmark_kernel.py --baseline kernel_baseline.json --threshold 0.25
+
+With ``--baseline`` the run exits non-zero when any variant is slower per
+row than the baseline by more than ``--threshold``. Variants that loop in
+Python stop at ``--max-loop-rows`` rows.
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from model import LinearModel
+from model_registry import DEFAULT_ARTIFACT_PATH, load_artifact
+from validation import FEATURE_RANGES
+
+DTYPES = {"float32": np.float32, "float64": np.float64}
+FEATURE_WIDTHS = (8, 16, 32, 64, 128, 256)
+
+
+def make_matrix(n_rows, feature_names, dtype, seed=0):
+    """Random rows drawn uniformly from each feature's plausible range"""
+    rng = np.random.default_rng(seed)
+    X = np.empty((n_rows, len(feature_names)), dtype=dtype)
+    for j, name in enumerate(feature_names):
+        low, high = FEATURE_RANGES[name]
+        X[:, j] = rng.uniform(low, high, n_rows)
+    return X
+
+
+def _simple(model):
+    # Imported on first use: it builds the whole app
+    from main import predict_house_price_simple
+
+    return lambda rows: [predict_house_price_simple(row, model) for row in rows]
+
+
+def _cached(model):
+    """Prediction cache lookups that all hit, to compare with recomputing via "scalar"
+
+    The first call fills the cache; timing keeps the best repeat, so only hits count.
+    """
+    from prediction_cache import PredictionCache
+
+    cache = PredictionCache(maxsize=sys.maxsize, ttl=float("inf"))
+
+    def score(rows):
+        predictions = []
+        for row in rows:
+            prediction = cache.get(model, row)
+            if prediction is None:
+                prediction = model.predict_scalar(row)
+                cache.put(model, row, prediction)
+            predictions.append(prediction)
+        return predictions
+
+    return score
+
+
+# name -> (input kind, loops in Python, factory returning fn(inputs))
+VARIANTS = {
+    "simple": ("list", True, _simple),
+    "cached": ("list", True, _cached),
+    "scalar": ("list", True, lambda model: lambda rows: [model.predict_scalar(row) for row in rows]),
+    "row": ("array", True, lambda model: lambda X: [model.predict_row(row) for row in X]),
+    "matrix": ("array", False, lambda model: model.predict_matrix),
+}
+
+
+def measure(fn, arg, n_rows, min_time):
+    """Return (ns/row, peak traced bytes of one call) for fn(arg)
+
+    The peak is the most memory held at once during the call above what was
+    held before it, not the number or total size of allocations; a call
+    that allocates and frees the same block in a loop counts it once.
+    """
+    timer = timeit.Timer(lambda: fn(arg))
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=5, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best * 1e9 / n_rows, peak - baseline
+
+
+def run_batches(model, variants, dtypes, sizes, max_loop_rows, min_time):
+    results = []
+    feature_names = list(model.feature_names)
+    for dtype_name in dtypes:
+        X_all = make_matrix(max(sizes), feature_names, DTYPES[dtype_name])
+        for n_rows in sizes:
+            X = X_all[:n_rows]
+            rows = X.tolist() if n_rows <= max_loop_rows else None
+            for name in variants:
+                kind, loops, factory = VARIANTS[name]
+                if loops and n_rows > max_loop_rows:
+                    continue
+                fn = factory(model)
+                ns_per_row, peak_bytes = measure(fn, rows if kind == "list" else X, n_rows, min_time)
+                results.append({
+                    "variant": name, "dtype": dtype_name, "rows": n_rows,
+                    "ns_per_row": ns_per_row, "peak_bytes_per_call": peak_bytes,
+                })
+                print(f"{name:<8}{dtype_name:<9}{n_rows:>10,} rows {ns_per_row:>12.1f} ns/row "
+                      f"{peak_bytes:>14,} B peak")
+        del X_all
+    return results
+
+
+def run_widths(min_time):
+    """Single-row scalar vs NumPy row path as the feature count grows"""
+    results = []
+    rng = np.random.default_rng(0)
+    for width in FEATURE_WIDTHS:
+        model = LinearModel(rng.normal(size=width), 0.5, [f"f{i}" for i in range(width)])
+        row = rng.normal(size=width)
+        row_list = row.tolist()
+        scalar_ns, _ = measure(model.predict_scalar, row_list, 1, min_time)
+        row_ns, _ = measure(model.predict_row, row, 1, min_time)
+        results.append({"features": width, "scalar_ns": scalar_ns, "row_ns": row_ns})
+        print(f"{width:>4} features  scalar {scalar_ns:>9.1f} ns  row {row_ns:>9.1f} ns")
+    return results
+
+
+def crossovers(results):
+    """Smallest batch size at which each NumPy variant beats the scalar loop"""
+    timings = {(r["variant"], r["dtype"], r["rows"]): r["ns_per_row"] for r in results}
+    found = {}
+    for variant, dtype, n_rows in sorted(timings, key=lambda key: key[2]):
+        if variant in ("scalar", "simple", "cached"):
+            continue
+        scalar = timings.get(("scalar", dtype, n_rows))
+        key = f"{variant}/{dtype}"
+        if scalar is not None and key not in found and timings[(variant, dtype, n_rows)] < scalar:
+            found[key] = n_rows
+    return found
+
+
+def check_regressions(results, baseline, threshold):
+    """Return descriptions of variants slower per row than the baseline"""
+    previous = {(r["variant"], r["dtype"], r["rows"]): r for r in baseline.get("batches", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["variant"], result["dtype"], result["rows"]))
+        if before is None:
+            continue
+        change = result["ns_per_row"] / before["ns_per_row"] - 1
+        if change > threshold:
+            regressions.append(
+                f"{result['variant']}/{result['dtype']}/{result['rows']} rows: "
+                f"{before['ns_per_row']:.1f} -> {result['ns_per_row']:.1f} ns/row ({change:+.0%})"
+            )
+    return regressions
+
+
+def main(args):
+    model = load_artifact(args.model)
+    sizes = [10 ** k for k in range(args.max_exponent + 1)]
+
+    print("Batch sizes")
+    batches = run_batches(model, args.variants, args.dtypes, sizes, args.max_loop_rows, args.min_time)
+    found = crossovers(batches)
+    print("\nNumPy path first beats the scalar loop at")
+    for key, n_rows in found.items():
+        print(f"  {key:<16}{n_rows:>10,} rows")
+
+    widths = []
+    if not args.skip_widths:
+        print("\nSingle row, by feature count")
+        widths = run_widths(args.min_time)
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "model_version": model.version,
+        "batches": batches,
+        "crossovers": found,
+        "widths": widths,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = check_regressions(batches, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressed beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo variant regressed beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark the prediction kernel")
+    parser.add_argument("--model", default=DEFAULT_ARTIFACT_PATH, help="Model artifact (.npz)")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--dtypes", nargs="+", choices=list(DTYPES), default=list(DTYPES))
+    parser.add_argument("--max-exponent", type=int, default=7, help="Largest batch is 10**N rows")
+    parser.add_argument("--max-loop-rows", type=int, default=100000,
+                        help="Largest batch for variants that loop in Python")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per timing run")
+    parser.add_argument("--skip-widths", action="store_true", help="Skip the feature-count sweep")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Baseline JSON file to check against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative slowdown in ns/row that counts as a regression")
+    main(parser.parse_args())
@@ -1,4 +1,6 @@
 #!/bin/bash
 # Build script for Render deployment
 pip install --upgrade pip wheel setuptools
-pip install -r requirements.txt
\ No newline at end of file
+pip install -r requirements.txt
+# Reference properties for /comparables and the heatmap percentiles
+python comparables.py build reference_properties.npz || echo "Reference dataset unavailable; /comparables disabled"
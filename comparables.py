@@ -0,0 +1,382 @@
+"""Nearest reference properties ("comparables") by location
+
+Reference properties (feature rows plus their known values) are stored in a
+compressed ``.npz`` file and indexed once at startup in a balanced k-d tree
+over their lat/long. Leaves hold a fixed number of points, so dense clusters
+(a city among rural blocks) cost no more to search than sparse areas.
+
+The dataset is the 20,640-block California housing census data, built at
+deploy time (see build.sh) from the StatLib archive that scikit-learn also
+uses. Only NumPy is needed:
+
+    python comparables.py build reference_properties.npz
+    python comparables.py build --archive cal_housing.tgz   # offline, from a saved copy
+"""
+import argparse
+import hashlib
+import math
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+from model_registry import BASE_DIR, DEFAULT_FEATURE_NAMES
+
+REFERENCE_FORMAT_VERSION = 1
+DEFAULT_REFERENCE_PATH = os.path.join(BASE_DIR, "reference_properties.npz")
+
+CAL_HOUSING_URL = "https://ndownloader.figshare.com/files/5976036"
+CAL_HOUSING_SHA256 = "aaa5c9a6afe2225cc2aed2723682ae403280c4a3695a2ddda4ffb5d8215ea681"
+CAL_HOUSING_MEMBER = "CaliforniaHousing/cal_housing.data"
+
+KM_PER_DEGREE = 111.195
+# Most points in one k-d tree leaf, each scanned with a single vectorized pass
+LEAF_SIZE = 32
+# Fewest points in the node a lookup takes its first search radius from
+MIN_START_POINTS = 128
+
+
+class ReferenceDataError(Exception):
+    """Raised when a reference dataset is missing or malformed"""
+
+
+def save_reference(path, features, values, feature_names):
+    """Write reference feature rows and their values (in dollars) to a compressed .npz"""
+    features = np.asarray(features, dtype="<f8")
+    values = np.asarray(values, dtype="<f8")
+    if features.ndim != 2 or features.shape != (len(values), len(feature_names)):
+        raise ValueError(
+            f"Expected features of shape ({len(values)}, {len(feature_names)}), got {features.shape}"
+        )
+    np.savez_compressed(
+        path,
+        format_version=np.array(REFERENCE_FORMAT_VERSION),
+        features=features,
+        values=values,
+        feature_names=np.array(feature_names, dtype=str),
+    )
+
+
+def load_reference(path=DEFAULT_REFERENCE_PATH):
+    """Load a reference dataset as (features, values, feature_names)"""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            format_version = int(data["format_version"])
+            features = data["features"].astype(np.float64)
+            values = data["values"].astype(np.float64)
+            feature_names = [str(name) for name in data["feature_names"]]
+    except (OSError, KeyError, ValueError) as e:
+        raise ReferenceDataError(f"Cannot read reference dataset {path}: {e}") from e
+    if format_version != REFERENCE_FORMAT_VERSION:
+        raise ReferenceDataError(f"Unsupported reference format {format_version} in {path}")
+    return features, values, feature_names
+
+
+class KDTreeIndex:
+    """Balanced k-d tree over a fixed set of lat/long points for k-nearest lookups
+
+    Every split halves a node's points across its wider side, so each leaf
+    holds at most ``leaf_size`` points however tightly the data clusters, and
+    a lookup's cost does not grow with local density. The tree is implicit:
+    node i has children 2i + 1 and 2i + 2 and all leaves sit on the last
+    level, so every node's points are one contiguous slice of the sorted
+    arrays.
+
+    Distances are equirectangular around the query latitude, which is well
+    within 0.1% of great-circle distance over the few km comparables span.
+    """
+
+    def __init__(self, latitudes, longitudes, leaf_size=LEAF_SIZE):
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        if len(lat) == 0:
+            raise ValueError("Cannot index an empty point set")
+        n_points = len(lat)
+        depth = max(math.ceil(math.log2(n_points / leaf_size)), 0)
+
+        # Longitude degrees in km at the data's mean latitude, only to pick split sides
+        lon_scale = math.cos(math.radians(float(lat.mean())))
+        order = np.arange(n_points)
+        bounds = [0, n_points]
+        split_on_lat, split_at = [], []
+        for _ in range(depth):
+            next_bounds = [0]
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                mid = (lo + hi) // 2
+                node = order[lo:hi]
+                node_lat, node_lon = lat[node], lon[node]
+                on_lat = bool(np.ptp(node_lat) >= np.ptp(node_lon) * lon_scale)
+                key = node_lat if on_lat else node_lon
+                partition = np.argpartition(key, mid - lo)
+                order[lo:hi] = node[partition]
+                split_on_lat.append(on_lat)
+                # Points left of the split are <= this value, points right of it >=
+                split_at.append(float(key[partition[mid - lo]]))
+                next_bounds += [mid, hi]
+            bounds = next_bounds
+
+        self.order = order
+        self.lat = np.ascontiguousarray(lat[order])
+        self.lon = np.ascontiguousarray(lon[order])
+        self.n_points = n_points
+        self.depth = depth
+        self.n_leaves = 1 << depth
+        # _leaf_start[j]:_leaf_start[j + 1] are the sorted positions of leaf j's points
+        self._leaf_start = bounds
+        self._split_on_lat = split_on_lat
+        self._split_at = split_at
+
+        # Bounding boxes of the leaves, then of each level above from its children
+        boxes = np.empty((4, 2 * self.n_leaves - 1))
+        first_leaf = self.n_leaves - 1
+        starts = bounds[:-1]
+        boxes[0, first_leaf:] = np.minimum.reduceat(self.lat, starts)
+        boxes[1, first_leaf:] = np.maximum.reduceat(self.lat, starts)
+        boxes[2, first_leaf:] = np.minimum.reduceat(self.lon, starts)
+        boxes[3, first_leaf:] = np.maximum.reduceat(self.lon, starts)
+        for level in range(depth - 1, -1, -1):
+            parents = np.arange((1 << level) - 1, (2 << level) - 1)
+            left, right = boxes[:, 2 * parents + 1], boxes[:, 2 * parents + 2]
+            boxes[0::2, parents] = np.minimum(left[0::2], right[0::2])
+            boxes[1::2, parents] = np.maximum(left[1::2], right[1::2])
+        # Lookups read single values, which is much faster from lists than from arrays
+        self._lat_min, self._lat_max, self._lon_min, self._lon_max = boxes.tolist()
+
+    def _distances(self, positions, latitude, longitude, x_scale):
+        dy = (self.lat[positions] - latitude) * KM_PER_DEGREE
+        dx = (self.lon[positions] - longitude) * x_scale
+        return np.sqrt(dx * dx + dy * dy)
+
+    def query(self, latitude, longitude, k):
+        """Return (indices, distances_km) of the k nearest points, nearest first
+
+        Indices refer to the order the points were given in.
+
+        The query descends to the smallest node around it that still holds
+        MIN_START_POINTS (and k) points, whose k-th nearest point bounds the
+        search radius. It then climbs to the nearest ancestor whose split
+        region contains that radius and scans, in one vectorized pass, the
+        leaves under it whose bounding boxes come within the radius.
+        """
+        k = min(k, self.n_points)
+        # Scalar maths on Python floats is several times faster than on NumPy scalars
+        latitude, longitude = float(latitude), float(longitude)
+        x_scale = KM_PER_DEGREE * math.cos(math.radians(latitude))
+        leaf_start = self._leaf_start
+
+        # Descend, keeping each node on the path with the region its splits bound
+        min_points = max(k, MIN_START_POINTS)
+        node, leaf, span = 0, 0, self.n_leaves
+        region = (-math.inf, math.inf, -math.inf, math.inf)
+        path = [(node, region)]
+        while span > 1:
+            on_lat, at = self._split_on_lat[node], self._split_at[node]
+            go_left = (latitude if on_lat else longitude) < at
+            child_leaf = leaf if go_left else leaf + span // 2
+            if leaf_start[child_leaf + span // 2] - leaf_start[child_leaf] < min_points:
+                break
+            bounds = list(region)
+            bounds[(0 if on_lat else 2) + go_left] = at
+            node, leaf, span = 2 * node + 1 + (not go_left), child_leaf, span // 2
+            region = tuple(bounds)
+            path.append((node, region))
+
+        lo, hi = leaf_start[leaf], leaf_start[leaf + span]
+        distances = self._distances(slice(lo, hi), latitude, longitude, x_scale)
+        radius = float(np.partition(distances, k - 1)[k - 1])
+
+        for node, (lat_lo, lat_hi, lon_lo, lon_hi) in reversed(path):
+            if min((latitude - lat_lo) * KM_PER_DEGREE, (lat_hi - latitude) * KM_PER_DEGREE,
+                   (longitude - lon_lo) * x_scale, (lon_hi - longitude) * x_scale) >= radius:
+                break
+        positions = np.arange(lo, hi)
+        if node != path[-1][0]:
+            positions = self._positions_within(node, latitude, longitude, x_scale, radius)
+            distances = self._distances(positions, latitude, longitude, x_scale)
+
+        nearest = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(k)
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return self.order[positions[nearest]], distances[nearest]
+
+    def _positions_within(self, root, latitude, longitude, x_scale, radius):
+        """Sorted positions of the points in the leaves under root whose boxes come within radius"""
+        lat_min, lat_max = self._lat_min, self._lat_max
+        lon_min, lon_max = self._lon_min, self._lon_max
+        first_leaf = self.n_leaves - 1
+        starts, ends = [], []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            dy = max(lat_min[node] - latitude, latitude - lat_max[node], 0.0) * KM_PER_DEGREE
+            dx = max(lon_min[node] - longitude, longitude - lon_max[node], 0.0) * x_scale
+            if dx * dx + dy * dy > radius * radius:
+                continue
+            if node < first_leaf:
+                stack += (2 * node + 2, 2 * node + 1)
+                continue
+            lo, hi = self._leaf_start[node - first_leaf], self._leaf_start[node - first_leaf + 1]
+            # Leaves come out left to right, so neighbours merge into one run
+            if ends and ends[-1] == lo:
+                ends[-1] = hi
+            else:
+                starts.append(lo)
+                ends.append(hi)
+
+        starts, ends = np.array(starts), np.array(ends)
+        lengths = ends - starts
+        # One contiguous run per group of leaves: offset a single arange by each run's start
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(len(offsets))
+
+
+class ComparablesIndex:
+    """Reference properties with a spatial index over their locations"""
+
+    def __init__(self, features, values, feature_names):
+        self.features = np.asarray(features, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.feature_names = list(feature_names)
+        lat = self.features[:, self.feature_names.index("Latitude")]
+        lon = self.features[:, self.feature_names.index("Longitude")]
+        self.tree = KDTreeIndex(lat, lon)
+
+    @classmethod
+    def load(cls, path=DEFAULT_REFERENCE_PATH):
+        return cls(*load_reference(path))
+
+    def __len__(self):
+        return len(self.values)
+
+    def nearest(self, latitude, longitude, k=10):
+        """The k nearest reference properties as JSON-ready dicts, nearest first"""
+        indices, distances = self.tree.query(latitude, longitude, k)
+        rows = self.features[indices].tolist()
+        return [
+            {
+                "distance_km": round(distance, 3),
+                "value": value,
+                "features": dict(zip(self.feature_names, row)),
+            }
+            for distance, value, row in zip(distances.tolist(), self.values[indices].tolist(), rows)
+        ]
+
+
+def read_cal_housing_archive(archive_path):
+    """Per-block features (in DEFAULT_FEATURE_NAMES order) and values from cal_housing.tgz
+
+    The raw columns are longitude, latitude, median age, total rooms, total
+    bedrooms, population, households, median income and median value; room,
+    bedroom and occupancy counts become per-household averages, as in the
+    data the model was trained on.
+    """
+    try:
+        with tarfile.open(archive_path, mode="r:gz") as archive:
+            raw = np.loadtxt(archive.extractfile(CAL_HOUSING_MEMBER), delimiter=",", ndmin=2)
+    except (OSError, KeyError, ValueError, tarfile.TarError) as e:
+        raise ReferenceDataError(f"Cannot read California housing archive {archive_path}: {e}") from e
+
+    households = raw[:, 6]
+    features = np.column_stack([
+        raw[:, 7],               # MedInc
+        raw[:, 2],               # HouseAge
+        raw[:, 3] / households,  # AveRooms
+        raw[:, 4] / households,  # AveBedrms
+        raw[:, 5],               # Population
+        raw[:, 5] / households,  # AveOccup
+        raw[:, 1],               # Latitude
+        raw[:, 0],               # Longitude
+    ])
+    return features, raw[:, 8]
+
+
+def download_cal_housing(dest_path, url=CAL_HOUSING_URL):
+    """Download the California housing archive, verifying its SHA-256"""
+    digest = hashlib.sha256()
+    with urllib.request.urlopen(url, timeout=60) as response, open(dest_path, "wb") as f:
+        while True:
+            chunk = response.read(1 << 16)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    if digest.hexdigest() != CAL_HOUSING_SHA256:
+        raise ReferenceDataError(f"Checksum mismatch for {url}")
+
+
+def build_reference(path=DEFAULT_REFERENCE_PATH, archive_path=None):
+    """Save California housing as a reference dataset, downloading it unless archive_path is given"""
+    if archive_path is not None:
+        features, values = read_cal_housing_archive(archive_path)
+    else:
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            archive_path = os.path.join(tmp_dir, "cal_housing.tgz")
+            download_cal_housing(archive_path)
+            features, values = read_cal_housing_archive(archive_path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    save_reference(path, features, values, DEFAULT_FEATURE_NAMES)
+    return len(values)
+
+
+def clustered_points(n_points, sigma, seed=0):
+    """Synthetic (latitudes, longitudes): uniform over California, or normal around LA for a sigma"""
+    rng = np.random.default_rng(seed)
+    if sigma is None:
+        return rng.uniform(32.5, 42.0, n_points), rng.uniform(-124.4, -114.2, n_points)
+    return rng.normal(34.05, sigma, n_points), rng.normal(-118.25, sigma, n_points)
+
+
+def benchmark_queries(n_points, sigma, k=10, n_queries=2000, seed=0):
+    """Return (build seconds, mean query seconds) for k-nearest lookups near random points"""
+    lat, lon = clustered_points(n_points, sigma, seed)
+    start = time.perf_counter()
+    tree = KDTreeIndex(lat, lon)
+    build_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.integers(0, n_points, n_queries)
+    queries = list(zip((lat[picks] + rng.normal(0, 0.001, n_queries)).tolist(), lon[picks].tolist()))
+    start = time.perf_counter()
+    for latitude, longitude in queries:
+        tree.query(latitude, longitude, k)
+    return build_seconds, (time.perf_counter() - start) / n_queries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the comparables reference dataset")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subcommands.add_parser("build", help="Build the dataset from California housing")
+    build_parser.add_argument("path", nargs="?", default=DEFAULT_REFERENCE_PATH)
+    build_parser.add_argument("--archive", help="Use a saved cal_housing.tgz instead of downloading")
+
+    show_parser = subcommands.add_parser("show", help="Summarize a reference dataset")
+    show_parser.add_argument("path", nargs="?", default=DEFAULT_REFERENCE_PATH)
+
+    bench_parser = subcommands.add_parser("bench", help="Time lookups over synthetic clustered points")
+    bench_parser.add_argument("--points", type=int, default=2_000_000)
+    bench_parser.add_argument("--sigmas", type=float, nargs="+", default=[0.5, 0.2, 0.1, 0.05],
+                              help="Standard deviations in degrees of clusters around LA")
+    bench_parser.add_argument("-k", type=int, default=10)
+    bench_parser.add_argument("--queries", type=int, default=2000)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        n_rows = build_reference(args.path, args.archive)
+        print(f"Saved {n_rows:,} reference properties to {args.path}")
+    elif args.command == "bench":
+        for sigma in [None] + args.sigmas:
+            build_seconds, query_seconds = benchmark_queries(args.points, sigma, args.k, args.queries)
+            label = "uniform" if sigma is None else f"sigma {sigma:g}"
+            print(f"{label:<12}{args.points:>12,} points  build {build_seconds:6.2f} s  "
+                  f"query {query_seconds * 1e6:8.1f} us")
+    else:
+        index = ComparablesIndex.load(args.path)
+        tree = index.tree
+        print(f"Properties: {len(index):,}")
+        print(f"Tree:       {tree.n_leaves:,} leaves of up to {LEAF_SIZE} points, depth {tree.depth}")
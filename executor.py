@@ -0,0 +1,48 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExecutorFull(Exception):
+    """Raised when a BoundedExecutor has no free slot for new work"""
+
+
+class BoundedExecutor:
+    """Thread pool with a hard cap on running plus queued jobs
+
+    Work beyond ``max_workers + max_queue`` is rejected immediately with
+    ExecutorFull instead of piling up, so callers can shed load with a 503.
+    A slot is freed when its job finishes on the pool, not when the caller
+    stops waiting, so a cancelled request still holds its slot while its job
+    runs.
+    """
+
+    def __init__(self, max_workers, max_queue):
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch")
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool, or raise ExecutorFull if it is saturated"""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                raise ExecutorFull(f"{self.in_flight} jobs already running or queued")
+            self.in_flight += 1
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Runs on the worker thread once the job is done, or at once if a queued
+        # job is cancelled before it starts
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,50 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+
+def dumps(obj):
+    """Encode obj as compact JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+class PredictionEncoder:
+    """Encodes /predict responses from pre-encoded byte fragments
+
+    Everything that only depends on the model (feature names and version) is
+    encoded once per model; each response only encodes the prediction and
+    the echoed input features.
+    """
+
+    def __init__(self, feature_names):
+        self.feature_names_json = dumps(list(feature_names))
+        # (model, full tail, compact tail), replaced as one tuple on model change
+        self._tails = (None, b"", b"")
+
+    def _tails_for(self, model):
+        tails = self._tails
+        if tails[0] is not model:
+            version = dumps(model.version)
+            full_tail = (
+                b',"feature_names":' + self.feature_names_json
+                + b',"model_version":' + version + b"}"
+            )
+            tails = (model, full_tail, b',"model_version":' + version + b"}")
+            self._tails = tails
+        return tails
+
+    def encode(self, model, prediction, features, compact=False):
+        _, full_tail, compact_tail = self._tails_for(model)
+        if compact:
+            return b'{"prediction":' + dumps(prediction) + compact_tail
+        return b"".join((
+            b'{"prediction":', dumps(prediction),
+            b',"prediction_formatted":', dumps(f"${prediction:,.2f}"),
+            b',"input_features":', dumps(features),
+            full_tail,
+        ))
@@ -0,0 +1,80 @@
+"""Gradio UI for the house price model
+
+Only imported when the UI is actually served: gradio adds seconds of import
+time and hundreds of MB to a process. ``main_simple.py`` builds it on the
+first request to ``/gradio``; ``python gradio_ui.py`` runs it as a separate
+process instead, leaving the API workers free of gradio entirely.
+"""
+import os
+
+import gradio as gr
+
+from validation import ValidationFailed
+
+
+def describe_error(error, feature_names):
+    """An error's message, naming the feature when the message itself does not"""
+    field = error["loc"][-1]
+    if error["type"] == "value_error.missing" and isinstance(field, int):
+        return f"{feature_names[field]}: {error['msg']}"
+    return error["msg"]
+
+
+def make_gradio_predict(predict, validator):
+    """Wrap a predict(features) function for the Gradio form"""
+    def predict_house_price_gradio(median_income, house_age, avg_rooms, avg_bedrooms,
+                                   population, avg_occupancy, latitude, longitude):
+        try:
+            features = [median_income, house_age, avg_rooms, avg_bedrooms,
+                        population, avg_occupancy, latitude, longitude]
+            validator.check_row(features)
+            prediction = predict(features)
+
+            return f"${prediction:,.2f}"
+        except ValidationFailed as e:
+            return "Error: " + "; ".join(describe_error(error, validator.feature_names) for error in e.errors)
+        except Exception as e:
+            return f"Error: {str(e)}"
+    return predict_house_price_gradio
+
+
+def create_gradio_interface(predict, validator):
+    interface = gr.Interface(
+        fn=make_gradio_predict(predict, validator),
+        inputs=[
+            gr.Number(value=8.3252, label="Median Income"),
+            gr.Number(value=41.0, label="House Age"),
+            gr.Number(value=6.98, label="Average Rooms"),
+            gr.Number(value=1.02, label="Average Bedrooms"),
+            gr.Number(value=322, label="Population"),
+            gr.Number(value=2.55, label="Average Occupancy"),
+            gr.Number(value=37.88, label="Latitude"),
+            gr.Number(value=-122.23, label="Longitude")
+        ],
+        outputs=gr.Textbox(label="Predicted House Price"),
+        title="🏠 House Price Predictor (Simplified)",
+        description="Enter housing features to predict median house value. Uses pre-trained linear model coefficients.",
+        examples=[
+            [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23],
+            [8.3014, 21.0, 6.24, 0.97, 2401, 2.11, 37.86, -122.22],
+            [7.2574, 52.0, 8.29, 1.07, 496, 2.80, 37.85, -122.24]
+        ]
+    )
+    return interface
+
+
+def create_gradio_app(predict, validator):
+    """A standalone ASGI app serving the interface at its root, for mounting"""
+    from fastapi import FastAPI
+
+    return gr.mount_gradio_app(FastAPI(), create_gradio_interface(predict, validator), path="/")
+
+
+if __name__ == "__main__":
+    from model_registry import ModelRegistry
+    from validation import FeatureValidator
+
+    registry = ModelRegistry()
+    validator = FeatureValidator(registry.current().feature_names)
+    interface = create_gradio_interface(lambda features: registry.current().predict(features), validator)
+    interface.launch(server_name="0.0.0.0", server_port=int(os.environ.get("GRADIO_PORT", 7860)))
@@ -0,0 +1,30 @@
+"""Gunicorn settings for multi-worker serving
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master (``preload_app``), so the model and
+the compressed HTML pages are built before forking and every worker shares
+those pages copy-on-write. ``gc.freeze()`` moves everything loaded so far
+out of the collector's reach; otherwise the first collection in each worker
+writes to every object header and un-shares the pages.
+"""
+import gc
+import multiprocessing
+import os
+
+# One process per core scales better than BLAS threads competing inside each
+# worker; must be set before numpy is imported by the preloaded app
+for _var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 10000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("WORKER_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    gc.freeze()
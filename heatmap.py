@@ -0,0 +1,261 @@
+"""Predicted-price heatmap tiles over California
+
+Tiles follow the usual web map ``/{z}/{x}/{y}`` scheme (Web Mercator, 256x256
+pixels). Each tile is scored in one ``predict_matrix`` call over the
+meshgrid of its pixel centres, with every feature other than Latitude and
+Longitude held at a chosen percentile. Prices are quantized to 8-bit indices
+into a fixed colour palette and written as a palette PNG, so a tile is a few
+KB. Pixels outside the plausible Latitude/Longitude range are transparent.
+
+Rendered tiles are cached on disk under ``<cache_dir>/<model version>/<baseline>/``,
+so each tile is computed once per model version and shared by all workers.
+``<baseline>`` is ``training`` or a digest of the reference dataset the held
+features come from. Pre-render the lower zoom levels with:
+
+    python heatmap.py render --max-zoom 8
+
+which, like the server, holds features at the percentiles of
+``REFERENCE_DATA_PATH`` when that file exists.
+"""
+import argparse
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+from model_registry import BASE_DIR, DEFAULT_FEATURE_NAMES
+from validation import FEATURE_RANGES
+
+TILE_SIZE = 256
+MAX_TILE_ZOOM = 12
+DEFAULT_TILE_CACHE_DIR = os.path.join(BASE_DIR, "tile_cache")
+
+# Prices map linearly onto palette indices 1..255 over this range (index 0 is
+# transparent); the California housing target is capped at $500,001
+PRICE_RANGE = (0.0, 500000.0)
+
+LAT_RANGE = FEATURE_RANGES["Latitude"]
+LON_RANGE = FEATURE_RANGES["Longitude"]
+
+# With a reference dataset, features can be held at any multiple of this
+# percentile. A fixed set bounds the baselines kept in memory and the tile
+# trees written to disk
+PERCENTILE_STEP = 5
+
+# Quartiles of the California housing training data, used for the held
+# features when no reference dataset is loaded
+TRAINING_PERCENTILES = {
+    25: [2.5634, 18.0, 4.4407, 1.0061, 787.0, 2.4297, 33.93, -121.8],
+    50: [3.5348, 29.0, 5.2291, 1.0488, 1166.0, 2.8181, 34.26, -118.49],
+    75: [4.7432, 37.0, 6.0524, 1.0995, 1725.0, 3.2823, 37.71, -118.01],
+}
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(indices, palette, transparent_index=0):
+    """Encode a (height, width) uint8 index array as an 8-bit palette PNG"""
+    height, width = indices.shape
+    # Each scanline starts with filter type 0 (None)
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = indices
+    alpha = bytes([0 if i == transparent_index else 255 for i in range(len(palette) // 3)])
+    return b"".join([
+        _PNG_SIGNATURE,
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)),
+        _png_chunk(b"PLTE", palette),
+        _png_chunk(b"tRNS", alpha),
+        _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+        _png_chunk(b"IEND", b""),
+    ])
+
+
+def make_palette():
+    """256 RGB entries: index 0 unused (transparent), 1..255 run blue, green, yellow, red"""
+    stops = np.array([
+        [49, 54, 149], [69, 117, 180], [116, 173, 209], [171, 217, 233],
+        [254, 224, 144], [253, 174, 97], [244, 109, 67], [215, 48, 39], [165, 0, 38],
+    ], dtype=np.float64)
+    positions = np.linspace(0, 1, len(stops))
+    t = np.linspace(0, 1, 255)
+    colors = np.column_stack([np.interp(t, positions, stops[:, c]) for c in range(3)])
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    palette[1:] = np.round(colors).astype(np.uint8)
+    return palette.tobytes()
+
+
+PALETTE = make_palette()
+
+
+def tile_pixel_centers(z, x, y, size=TILE_SIZE):
+    """Latitudes (top to bottom) and longitudes (left to right) of a tile's pixel centres"""
+    n = 2 ** z
+    steps = (np.arange(size) + 0.5) / size
+    lon = (x + steps) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + steps) / n))))
+    return lat, lon
+
+
+def tile_bounds(z, x, y):
+    """(south, north, west, east) edges of a tile in degrees"""
+    n = 2 ** z
+    west, east = x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, north, west, east
+
+
+def tile_in_range(z, x, y):
+    south, north, west, east = tile_bounds(z, x, y)
+    return south < LAT_RANGE[1] and north > LAT_RANGE[0] and west < LON_RANGE[1] and east > LON_RANGE[0]
+
+
+def tiles_covering_range(z):
+    """(x, y) of every tile at zoom z overlapping the plausible lat/long range"""
+    n = 2 ** z
+    x0 = int((LON_RANGE[0] + 180.0) / 360.0 * n)
+    x1 = int((LON_RANGE[1] + 180.0) / 360.0 * n)
+
+    def tile_y(lat):
+        return int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(tile_y(LAT_RANGE[1]), tile_y(LAT_RANGE[0]) + 1)]
+
+
+class TileRenderer:
+    """Renders heatmap tiles for a model and caches them on disk per model version
+
+    ``baseline(percentile)`` gives the full feature row whose non-location
+    features are held fixed; by default the training-data quartiles.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_TILE_CACHE_DIR, reference_features=None,
+                 feature_names=DEFAULT_FEATURE_NAMES):
+        self.cache_dir = cache_dir
+        self.reference_features = reference_features
+        self.feature_names = list(feature_names)
+        self.lat_index = self.feature_names.index("Latitude")
+        self.lon_index = self.feature_names.index("Longitude")
+        # Names the baseline source in cache paths and ETags, so tiles held at
+        # training quartiles and at reference percentiles never stand in for each other
+        if reference_features is None:
+            self.baseline_id = "training"
+        else:
+            digest = hashlib.sha256(np.ascontiguousarray(reference_features, dtype=np.float64).tobytes())
+            self.baseline_id = "ref-" + digest.hexdigest()[:12]
+        self._baselines = {}
+        self._empty = encode_png(np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.uint8), PALETTE)
+
+    def percentiles_available(self):
+        if self.reference_features is not None:
+            return list(range(0, 101, PERCENTILE_STEP))
+        return sorted(TRAINING_PERCENTILES)
+
+    def check_percentile(self, percentile):
+        """Return percentile as an int if tiles can be held at it; raises ValueError otherwise"""
+        available = self.percentiles_available()
+        if percentile not in available:
+            raise ValueError(f"percentile must be one of {available}")
+        return int(percentile)
+
+    def baseline(self, percentile):
+        """Feature row at the given percentile of each feature; raises ValueError if unavailable
+
+        The first call for a percentile scans the whole reference set, so call
+        this off the event loop.
+        """
+        percentile = self.check_percentile(percentile)
+        if self.reference_features is None:
+            return np.array(TRAINING_PERCENTILES[percentile], dtype=np.float64)
+        baseline = self._baselines.get(percentile)
+        if baseline is None:
+            baseline = np.percentile(self.reference_features, percentile, axis=0)
+            self._baselines[percentile] = baseline
+        return baseline
+
+    def render(self, model, z, x, y, percentile=50):
+        """Score one tile and encode it as a palette PNG"""
+        if not tile_in_range(z, x, y):
+            return self._empty
+        lat, lon = tile_pixel_centers(z, x, y)
+        lat_grid, lon_grid = np.meshgrid(lat, lon, indexing="ij")
+
+        X = np.empty((TILE_SIZE * TILE_SIZE, len(self.feature_names)), dtype=np.float64)
+        X[:] = self.baseline(percentile)
+        X[:, self.lat_index] = lat_grid.ravel()
+        X[:, self.lon_index] = lon_grid.ravel()
+        prices = model.predict_matrix(X).reshape(TILE_SIZE, TILE_SIZE)
+
+        low, high = PRICE_RANGE
+        indices = 1 + np.rint(np.clip((prices - low) / (high - low), 0, 1) * 254)
+        inside = ((lat_grid >= LAT_RANGE[0]) & (lat_grid <= LAT_RANGE[1])
+                  & (lon_grid >= LON_RANGE[0]) & (lon_grid <= LON_RANGE[1]))
+        indices[~inside] = 0
+        return encode_png(indices.astype(np.uint8), PALETTE)
+
+    def _cache_path(self, model, z, x, y, percentile):
+        return os.path.join(self.cache_dir, model.version, self.baseline_id, f"p{percentile}",
+                            str(z), str(x), f"{y}.png")
+
+    def get(self, model, z, x, y, percentile=50):
+        """Return a tile's PNG bytes, rendering and caching it on first use"""
+        percentile = self.check_percentile(percentile)
+        if not tile_in_range(z, x, y):
+            return self._empty
+        path = self._cache_path(model, z, x, y, percentile)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+
+        png = self.render(model, z, x, y, percentile)
+        # Write to a temporary file and rename, so other workers never read a partial tile
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+        return png
+
+
+if __name__ == "__main__":
+    from comparables import DEFAULT_REFERENCE_PATH, load_reference
+    from model_registry import DEFAULT_ARTIFACT_PATH, load_artifact
+
+    parser = argparse.ArgumentParser(description="Pre-render heatmap tiles into the disk cache")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    render_parser = subcommands.add_parser("render", help="Render every tile up to a zoom level")
+    render_parser.add_argument("--model", default=DEFAULT_ARTIFACT_PATH, help="Model artifact (.npz)")
+    render_parser.add_argument("--cache-dir", default=DEFAULT_TILE_CACHE_DIR)
+    render_parser.add_argument("--reference", default=os.environ.get("REFERENCE_DATA_PATH", DEFAULT_REFERENCE_PATH),
+                               help="Reference dataset for held features; training quartiles if missing")
+    render_parser.add_argument("--min-zoom", type=int, default=0)
+    render_parser.add_argument("--max-zoom", type=int, default=8)
+    render_parser.add_argument("--percentile", type=int, default=50)
+    args = parser.parse_args()
+
+    model = load_artifact(args.model)
+    reference_features = None
+    if args.reference and os.path.exists(args.reference):
+        reference_features = load_reference(args.reference)[0]
+    renderer = TileRenderer(args.cache_dir, reference_features=reference_features,
+                            feature_names=model.feature_names)
+    percentile = renderer.check_percentile(args.percentile)
+    total = 0
+    for z in range(args.min_zoom, args.max_zoom + 1):
+        tiles = tiles_covering_range(z)
+        for x, y in tiles:
+            renderer.get(model, z, x, y, percentile)
+        total += len(tiles)
+        print(f"zoom {z}: {len(tiles)} tiles")
+    print(f"Rendered {total} tiles for model {model.version} ({renderer.baseline_id} baseline) "
+          f"into {args.cache_dir}")
@@ -0,0 +1,77 @@
+import asyncio
+
+
+class LazyASGIApp:
+    """ASGI app that builds the real app on its first request
+
+    ``factory`` runs once, in a worker thread so a slow import does not stall
+    the event loop, and concurrent first requests wait for the same build.
+    Mounted apps never see the parent's lifespan events, so the built app's
+    startup is run here before the first request is passed on, and the
+    parent should call ``shutdown`` from its own shutdown handler.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.app = None
+        self._lock = None
+        self._lifespan_task = None
+        self._shutdown = None
+
+    async def _start_lifespan(self, app):
+        started = asyncio.get_running_loop().create_future()
+        self._shutdown = asyncio.Event()
+        sent_startup = False
+
+        async def receive():
+            nonlocal sent_startup
+            if not sent_startup:
+                sent_startup = True
+                return {"type": "lifespan.startup"}
+            await self._shutdown.wait()
+            return {"type": "lifespan.shutdown"}
+
+        async def send(message):
+            if message["type"] == "lifespan.startup.failed":
+                started.set_exception(RuntimeError(message.get("message", "startup failed")))
+            elif message["type"] == "lifespan.startup.complete":
+                started.set_result(None)
+
+        async def run():
+            try:
+                await app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, receive, send)
+            except Exception:
+                # Apps without lifespan support raise on the unknown scope type
+                if started.done():
+                    raise
+            if not started.done():
+                started.set_result(None)
+
+        self._lifespan_task = asyncio.create_task(run())
+        await started
+
+    async def shutdown(self):
+        """Run the built app's lifespan shutdown, if it was ever built"""
+        if self._lifespan_task is None:
+            return
+        self._shutdown.set()
+        task, self._lifespan_task = self._lifespan_task, None
+        await task
+
+    async def _build(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.app is None:
+                app = await asyncio.to_thread(self.factory)
+                await self._start_lifespan(app)
+                self.app = app
+        return self.app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return
+        app = self.app
+        if app is None:
+            app = await self._build()
+        await app(scope, receive, send)
@@ -0,0 +1,194 @@
+"""Prometheus text-format metrics, collected per worker process
+
+All updates happen on the event loop thread (in the ASGI middleware or in
+async handlers), so plain integer and float updates need no locks. Each
+worker exports its own series under a ``worker`` label; sum them across
+workers in queries with ``sum without (worker)``.
+"""
+import os
+import time
+from bisect import bisect_left
+
+from fastapi.responses import Response
+
+# Starlette appends "; charset=utf-8" to text/* media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+BATCH_SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000, 10000000)
+# Any other method is counted as "other", so clients cannot add label values at will
+METHODS = frozenset(("GET", "POST", "HEAD", "PUT", "DELETE", "OPTIONS", "PATCH"))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts are stored per bucket and summed on render"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': repr(float(bound))})} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {self.count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {self.sum!r}")
+        lines.append(f"{name}_count{_format_labels(labels)} {self.count}")
+        return lines
+
+
+class Metrics:
+    """Request counts, per-route latency and batch sizes for one worker"""
+
+    def __init__(self, routes, prefix_routes=()):
+        self.routes = frozenset(routes)
+        self.prefix_routes = tuple(prefix_routes)
+        self.requests = {}
+        self.latency = {}
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self._collectors = []
+
+    def route_label(self, path):
+        """Map a request path to a bounded set of route labels"""
+        if path in self.routes:
+            return path
+        for prefix in self.prefix_routes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return prefix
+        return "other"
+
+    @staticmethod
+    def method_label(method):
+        return method if method in METHODS else "other"
+
+    def observe_request(self, route, method, status, seconds):
+        key = (route, method, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latency.get(route)
+        if histogram is None:
+            histogram = self.latency[route] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    def observe_batch_size(self, n_rows):
+        self.batch_sizes.observe(n_rows)
+
+    def add_collector(self, collector):
+        """Register a callable returning extra exposition lines at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self):
+        # Read at scrape time, so a registry created before forking still labels correctly
+        worker = {"worker": str(os.getpid())}
+        lines = [
+            "# HELP http_requests_total Requests handled, by route, method and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (route, method, status), count in sorted(self.requests.items()):
+            labels = {**worker, "route": route, "method": method, "status": status}
+            lines.append(f"http_requests_total{_format_labels(labels)} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Request latency, by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for route, histogram in sorted(self.latency.items()):
+            lines += histogram.render("http_request_duration_seconds", {**worker, "route": route})
+
+        lines += [
+            "# HELP prediction_batch_rows Rows per batch scoring request.",
+            "# TYPE prediction_batch_rows histogram",
+        ]
+        lines += self.batch_sizes.render("prediction_batch_rows", worker)
+
+        for collector in self._collectors:
+            lines += collector(worker)
+        return "\n".join(lines) + "\n"
+
+    def response(self):
+        return Response(content=self.render(), media_type=CONTENT_TYPE)
+
+
+def gauge(name, help_text, value, labels, metric_type="gauge"):
+    """Exposition lines for a single-sample gauge or counter"""
+    return [
+        f"# HELP {name} {help_text}",
+        f"# TYPE {name} {metric_type}",
+        f"{name}{_format_labels(labels)} {value!r}",
+    ]
+
+
+def cache_collector(cache):
+    """Collector exporting a PredictionCache's counters and hit rate"""
+    def collect(labels):
+        stats = cache.stats()
+        lines = []
+        for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            lines += gauge(f"prediction_cache_{key}_total", f"Prediction cache {key}.",
+                           stats[key], labels, "counter")
+        lines += gauge("prediction_cache_hit_rate", "Share of cache lookups that hit.",
+                       stats["hit_rate"], labels)
+        lines += gauge("prediction_cache_size", "Entries in the prediction cache.",
+                       stats["size"], labels)
+        return lines
+    return collect
+
+
+def model_collector(registry):
+    """Collector exporting the serving model version as an info-style gauge"""
+    def collect(labels):
+        version = registry.current().version
+        return gauge("model_info", "Serving model version.", 1, {**labels, "version": version})
+    return collect
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request"""
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Read before routing: Mount rewrites scope["path"] to the path inside the mount
+        route = self.metrics.route_label(scope["path"])
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.observe_request(
+                route,
+                self.metrics.method_label(scope["method"]),
+                str(status),
+                time.perf_counter() - started,
+            )
@@ -0,0 +1,58 @@
+import asyncio
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one matrix product
+
+    Rows submitted within ``max_wait`` seconds of the first pending row are
+    scored together, or as soon as ``max_batch_size`` rows are waiting. Each
+    row is scored with the model its request started with, so a model swap
+    in the middle of a window is still honoured.
+    """
+
+    def __init__(self, max_wait, max_batch_size):
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, model, row):
+        """Queue one row and wait for its predicted price in dollars"""
+        if len(row) != model.n_features:
+            raise ValueError(f"Expected {model.n_features} features, got {len(row)}")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((model, row, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+
+        by_model = {}
+        for model, row, future in pending:
+            by_model.setdefault(id(model), (model, []))[1].append((row, future))
+
+        for model, entries in by_model.values():
+            try:
+                X = np.array([row for row, _ in entries], dtype=np.float64)
+                predictions = model.predict_matrix(X).tolist()
+            except Exception as e:
+                for _, future in entries:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(entries, predictions):
+                # A request that was cancelled while waiting has nobody to answer
+                if not future.done():
+                    future.set_result(prediction)
@@ -0,0 +1,171 @@
+import numpy as np
+
+# Model outputs are in units of $100,000
+PRICE_SCALE = 100000
+
+# Single rows up to this many features are scored in pure Python; NumPy's
+# per-call overhead outweighs the arithmetic for short vectors. Past the
+# unrolled 8-feature case the generic Python sum loses to NumPy (see the
+# feature-count sweep in benchmark_kernel.py)
+SCALAR_PATH_MAX_FEATURES = 8
+
+
+def _pairwise_sum(values):
+    """Sum floats in the same order as NumPy's pairwise add.reduce
+
+    Matching NumPy's summation order keeps the pure-Python and NumPy row
+    paths bit-for-bit identical.
+    """
+    n = len(values)
+    if n < 8:
+        total = 0.0
+        for value in values:
+            total += value
+        return total
+    if n <= 128:
+        r = list(values[:8])
+        i = 8
+        while i < n - (n % 8):
+            for j in range(8):
+                r[j] += values[i + j]
+            i += 8
+        total = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+        while i < n:
+            total += values[i]
+            i += 1
+        return total
+    half = n // 2
+    half -= half % 8
+    return _pairwise_sum(values[:half]) + _pairwise_sum(values[half:])
+
+
+class LinearModel:
+    """Immutable linear regression model, built once and shared by every request
+
+    ``transform`` is an optional compiled ``transforms.FeaturePipeline`` that
+    turns the input features into the terms ``coef`` applies to; without one
+    the terms are the input features themselves. Predictions multiply the
+    request features by their coefficients directly and add only the columns
+    the pipeline writes, so untouched features are never copied.
+    """
+
+    __slots__ = ("coef", "intercept", "feature_names", "n_features", "version", "transform",
+                 "term_names", "_coef_tuple", "_input_coef", "_written_coef", "_written_coef_tuple")
+
+    def __init__(self, coefficients, intercept, feature_names, version=None, transform=None):
+        coef = np.ascontiguousarray(coefficients, dtype=np.float64)
+        terms = transform.term_names if transform is not None else tuple(feature_names)
+        if coef.ndim != 1 or len(coef) != len(terms):
+            raise ValueError(
+                f"Expected {len(terms)} coefficients, got shape {coef.shape}"
+            )
+        coef.setflags(write=False)
+
+        object.__setattr__(self, "coef", coef)
+        object.__setattr__(self, "intercept", float(intercept))
+        object.__setattr__(self, "feature_names", tuple(feature_names))
+        object.__setattr__(self, "n_features", len(feature_names))
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "transform", transform)
+        object.__setattr__(self, "term_names", tuple(terms))
+        if transform is None:
+            input_coef, written_coef = coef, None
+        else:
+            # Inputs the pipeline rewrites contribute through their written column instead
+            input_coef = coef[:len(feature_names)].copy()
+            input_coef[[j for j in transform.written if j < len(feature_names)]] = 0.0
+            written_coef = coef[list(transform.written)]
+        object.__setattr__(self, "_input_coef", input_coef)
+        object.__setattr__(self, "_coef_tuple", tuple(input_coef.tolist()))
+        object.__setattr__(self, "_written_coef", written_coef)
+        object.__setattr__(self, "_written_coef_tuple",
+                           tuple(written_coef.tolist()) if written_coef is not None else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LinearModel is immutable")
+
+    def _check_length(self, n):
+        if n != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {n}")
+
+    def terms(self, X):
+        """The (n_rows, n_terms) matrix coef applies to; X itself without a transform"""
+        if self.transform is None:
+            return X
+        return self.transform.apply_matrix(X)
+
+    def predict(self, features):
+        """Predict prices, picking the scalar, row or matrix path by input shape
+
+        The scalar and row paths return the same bits for the same row. The
+        matrix path leaves the summation order to BLAS, so it can differ from
+        them in the last bits.
+        """
+        if isinstance(features, np.ndarray) and features.ndim == 2:
+            return self.predict_matrix(features)
+        if len(features) > SCALAR_PATH_MAX_FEATURES:
+            return self.predict_row(np.asarray(features, dtype=np.float64))
+        return self.predict_scalar(features)
+
+    def predict_scalar(self, features):
+        """Predict the price in dollars for one row without touching NumPy"""
+        self._check_length(len(features))
+        if self.n_features == 8:
+            c0, c1, c2, c3, c4, c5, c6, c7 = self._coef_tuple
+            x0, x1, x2, x3, x4, x5, x6, x7 = features
+            total = (((c0 * x0 + c1 * x1) + (c2 * x2 + c3 * x3))
+                     + ((c4 * x4 + c5 * x5) + (c6 * x6 + c7 * x7)))
+        else:
+            total = _pairwise_sum([c * x for c, x in zip(self._coef_tuple, features)])
+        if self.transform is not None:
+            written = self.transform.apply_written_row(features)
+            total += _pairwise_sum([c * w for c, w in zip(self._written_coef_tuple, written)])
+        return (self.intercept + total) * PRICE_SCALE
+
+    def predict_row(self, row):
+        """Predict the price in dollars for one row given as a 1-D float64 array
+
+        Used for rows wider than SCALAR_PATH_MAX_FEATURES.
+        """
+        self._check_length(row.shape[0])
+        total = float(np.add.reduce(row * self._input_coef))
+        if self.transform is not None:
+            written = self.transform.apply_written(row[np.newaxis])[0]
+            total += float(np.add.reduce(written * self._written_coef))
+        return (self.intercept + total) * PRICE_SCALE
+
+    def predict_matrix(self, X):
+        """Predict prices in dollars for a (n_rows, n_features) float64 matrix"""
+        self._check_length(X.shape[1])
+        predictions = X @ self._input_coef
+        if self.transform is not None:
+            predictions += self.transform.apply_written(X) @ self._written_coef
+        predictions += self.intercept
+        predictions *= PRICE_SCALE
+        return predictions
+
+    def predict_matrix_explained(self, X):
+        """Predict prices and per-term contributions for a matrix in one pass
+
+        Returns ``(predictions, contributions)``, where contributions is the
+        element-wise ``terms * coef`` in dollars (columns in term_names order)
+        and predictions are its row sums plus the intercept. Summing in a
+        different order than ``terms @ coef`` can change the last bits relative
+        to ``predict_matrix``.
+        """
+        self._check_length(X.shape[1])
+        contributions = self.terms(X) * (self.coef * PRICE_SCALE)
+        predictions = contributions.sum(axis=1)
+        predictions += self.intercept * PRICE_SCALE
+        return predictions, contributions
+
+    def contributions(self, X):
+        """Per-term products coef_i * t_i in dollars, for a row or a matrix of rows
+
+        Terms are in term_names order. Together with ``intercept * PRICE_SCALE``
+        they sum to the prediction, up to floating-point rounding.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.transform is not None:
+            X = self.transform.apply_matrix(np.atleast_2d(X)).reshape(X.shape[:-1] + (-1,))
+        return X * (self.coef * PRICE_SCALE)
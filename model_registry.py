@@ -0,0 +1,305 @@
+"""Model registry: loads the linear model from a compact, versioned artifact
+
+The trained scikit-learn model ships as ``house_model.pkl``. Unpickling it
+needs scikit-learn and runs arbitrary code, so it is exported once into
+``house_model.npz`` holding only plain arrays (coefficients, intercept,
+feature order and a checksum). Workers load the ``.npz`` with
+``allow_pickle=False`` and never import scikit-learn.
+
+An artifact may also carry a transform pipeline (see transforms.py) as a
+JSON string; such artifacts are written as format 2 so that older workers
+refuse them instead of scoring untransformed features. Affine steps are
+folded into the coefficients when the artifact is loaded.
+
+Export the artifact after retraining with:
+
+    python model_registry.py export house_model.pkl house_model.npz
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from model import LinearModel
+from transforms import TransformError, canonical_json, compile_pipeline, term_names
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT_VERSION = 1
+# Format 2 adds the optional ``transforms`` entry
+TRANSFORMS_FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (ARTIFACT_FORMAT_VERSION, TRANSFORMS_FORMAT_VERSION)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_PATH = os.path.join(BASE_DIR, "house_model.npz")
+DEFAULT_PICKLE_PATH = os.path.join(BASE_DIR, "house_model.pkl")
+
+# Feature order used when training; the pickled model does not record names
+DEFAULT_FEATURE_NAMES = [
+    'MedInc', 'HouseAge', 'AveRooms', 'AveBedrms',
+    'Population', 'AveOccup', 'Latitude', 'Longitude'
+]
+
+
+class ModelArtifactError(Exception):
+    """Raised when a model artifact is missing, malformed or fails its checksum"""
+
+
+def compute_checksum(coefficients, intercept, feature_names, transforms=None):
+    """SHA-256 over the little-endian coefficients, intercept, feature order and transforms
+
+    ``transforms`` is the canonical JSON of the step list; artifacts without
+    one hash exactly as before it existed.
+    """
+    digest = hashlib.sha256()
+    digest.update(np.asarray(coefficients, dtype="<f8").tobytes())
+    digest.update(np.asarray([intercept], dtype="<f8").tobytes())
+    digest.update("\0".join(feature_names).encode("utf-8"))
+    if transforms is not None:
+        digest.update(b"\0" + transforms.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def save_artifact(path, coefficients, intercept, feature_names, version=None, transforms=None):
+    """Write coefficients, intercept, feature order and checksum to an .npz file
+
+    ``transforms`` is an optional list of transform steps; the coefficients
+    then apply to the terms it produces, unfolded.
+    """
+    coefficients = np.asarray(coefficients, dtype="<f8")
+    transforms_json = None
+    extra = {}
+    if transforms:
+        try:
+            names = term_names(transforms, feature_names)
+        except TransformError as e:
+            raise ModelArtifactError(str(e)) from e
+        if len(coefficients) != len(names):
+            raise ModelArtifactError(f"Expected {len(names)} coefficients for terms {names}")
+        transforms_json = canonical_json(transforms)
+        extra["transforms"] = np.array(transforms_json)
+    checksum = compute_checksum(coefficients, intercept, feature_names, transforms_json)
+    if version is None:
+        version = checksum[:12]
+
+    np.savez(
+        path,
+        format_version=np.array(TRANSFORMS_FORMAT_VERSION if extra else ARTIFACT_FORMAT_VERSION),
+        coefficients=coefficients,
+        intercept=np.array(intercept, dtype="<f8"),
+        feature_names=np.array(feature_names, dtype=str),
+        checksum=np.array(checksum),
+        version=np.array(version),
+        **extra,
+    )
+    return checksum
+
+
+def _transforms_from_sklearn(estimator, feature_names):
+    """Split a StandardScaler -> LinearRegression pipeline into (regressor, transform steps)"""
+    if not hasattr(estimator, "steps"):
+        return estimator, None
+    *preprocessors, (_, regressor) = estimator.steps
+    steps = []
+    for _, scaler in preprocessors:
+        if type(scaler).__name__ != "StandardScaler":
+            raise ModelArtifactError(f"Cannot export pipeline step {scaler!r}")
+        means = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(feature_names))
+        stds = scaler.scale_ if scaler.scale_ is not None else np.ones(len(feature_names))
+        steps.extend(
+            {"op": "standardize", "feature": name, "mean": float(mean), "std": float(std)}
+            for name, mean, std in zip(feature_names, means, stds)
+        )
+    return regressor, steps
+
+
+def export_from_pickle(pickle_path=DEFAULT_PICKLE_PATH, artifact_path=DEFAULT_ARTIFACT_PATH,
+                       feature_names=None):
+    """Export a pickled scikit-learn LinearRegression into an .npz artifact
+
+    A ``Pipeline`` of StandardScaler steps ending in the regression is
+    exported with the scalers as standardize transforms.
+
+    This is the only place that unpickles the model, and it needs joblib and
+    scikit-learn installed. Run it once at build time, not in workers.
+    """
+    import joblib
+
+    estimator = joblib.load(pickle_path)
+    if feature_names is None:
+        names = getattr(estimator, "feature_names_in_", None)
+        feature_names = list(names) if names is not None else DEFAULT_FEATURE_NAMES
+    regressor, transforms = _transforms_from_sklearn(estimator, feature_names)
+
+    return save_artifact(
+        artifact_path,
+        np.ravel(regressor.coef_),
+        float(np.ravel(regressor.intercept_)[0]),
+        feature_names,
+        transforms=transforms,
+    )
+
+
+def load_artifact(path=DEFAULT_ARTIFACT_PATH):
+    """Load an .npz artifact into a LinearModel, verifying its checksum
+
+    Transform steps are compiled here: affine ones are folded into the
+    coefficients and intercept, the rest are kept on the model.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as artifact:
+            format_version = int(artifact["format_version"])
+            coefficients = artifact["coefficients"].astype(np.float64)
+            intercept = float(artifact["intercept"])
+            feature_names = [str(name) for name in artifact["feature_names"]]
+            checksum = str(artifact["checksum"])
+            version = str(artifact["version"])
+            transforms = str(artifact["transforms"]) if "transforms" in artifact.files else None
+    except (OSError, KeyError, ValueError) as e:
+        raise ModelArtifactError(f"Cannot read model artifact {path}: {e}") from e
+
+    if format_version not in SUPPORTED_FORMAT_VERSIONS:
+        raise ModelArtifactError(
+            f"Unsupported artifact format {format_version} in {path}"
+        )
+    if compute_checksum(coefficients, intercept, feature_names, transforms) != checksum:
+        raise ModelArtifactError(f"Checksum mismatch in model artifact {path}")
+
+    pipeline = None
+    if transforms is not None:
+        try:
+            pipeline, coefficients, intercept = compile_pipeline(
+                json.loads(transforms), feature_names, coefficients, intercept
+            )
+        except (TransformError, ValueError) as e:
+            raise ModelArtifactError(f"Invalid transforms in model artifact {path}: {e}") from e
+
+    return LinearModel(coefficients, intercept, feature_names, version=version, transform=pipeline)
+
+
+def load_model(artifact_path=DEFAULT_ARTIFACT_PATH, pickle_path=DEFAULT_PICKLE_PATH):
+    """Load the serving model, exporting the artifact from the pickle if it is missing"""
+    if not os.path.exists(artifact_path):
+        if not os.path.exists(pickle_path):
+            raise ModelArtifactError(
+                f"No model artifact at {artifact_path} and no pickle at {pickle_path}"
+            )
+        export_from_pickle(pickle_path, artifact_path)
+    return load_artifact(artifact_path)
+
+
+class ModelRegistry:
+    """Holds the serving model behind a single reference that can be swapped live
+
+    Handlers call ``current()`` once per request and use that model for the
+    whole request, so a swap never changes the model under an in-flight
+    request. Swapping is a single attribute assignment, which is atomic.
+    """
+
+    def __init__(self, artifact_path=DEFAULT_ARTIFACT_PATH, model=None):
+        self.artifact_path = artifact_path
+        self._model = model if model is not None else load_model(artifact_path)
+        self._swap_lock = threading.Lock()
+        self._watcher = None
+        self._swap_listeners = []
+        self._artifact_stamp = self._stat_artifact()
+
+    def current(self):
+        """Return the model to use for one request"""
+        return self._model
+
+    def add_swap_listener(self, listener):
+        """Call listener(new_model, previous_model) after every swap"""
+        self._swap_listeners.append(listener)
+
+    def swap(self, model):
+        """Replace the serving model, returning the one it replaced"""
+        with self._swap_lock:
+            previous = self._model
+            if model.feature_names != previous.feature_names:
+                raise ModelArtifactError(
+                    f"New model expects features {list(model.feature_names)}, "
+                    f"serving model expects {list(previous.feature_names)}"
+                )
+            self._model = model
+        logger.info("Swapped model %s -> %s", previous.version, model.version)
+        for listener in self._swap_listeners:
+            listener(model, previous)
+        return previous
+
+    def reload(self):
+        """Load the artifact from disk again and swap it in"""
+        stamp = self._stat_artifact()
+        previous = self.swap(load_artifact(self.artifact_path))
+        self._artifact_stamp = stamp
+        return previous
+
+    def _stat_artifact(self):
+        try:
+            stat = os.stat(self.artifact_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def start_watching(self, interval=2.0):
+        """Poll the artifact file and reload whenever it changes"""
+        if self._watcher is not None:
+            return
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._watch, args=(interval, stop), name="model-watcher", daemon=True
+        )
+        self._watcher = (thread, stop)
+        thread.start()
+
+    def stop_watching(self):
+        if self._watcher is None:
+            return
+        thread, stop = self._watcher
+        stop.set()
+        thread.join()
+        self._watcher = None
+
+    def _watch(self, interval, stop):
+        while not stop.wait(interval):
+            stamp = self._stat_artifact()
+            if stamp is None or stamp == self._artifact_stamp:
+                continue
+            try:
+                self.reload()
+            except ModelArtifactError as e:
+                # Keep serving the current model; a half-written file will be
+                # picked up again on the next poll once it changes
+                self._artifact_stamp = stamp
+                logger.warning("Ignoring model artifact change: %s", e)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage house price model artifacts")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subcommands.add_parser("export", help="Export a pickled model to .npz")
+    export_parser.add_argument("pickle_path", nargs="?", default=DEFAULT_PICKLE_PATH)
+    export_parser.add_argument("artifact_path", nargs="?", default=DEFAULT_ARTIFACT_PATH)
+
+    show_parser = subcommands.add_parser("show", help="Print an artifact's contents")
+    show_parser.add_argument("artifact_path", nargs="?", default=DEFAULT_ARTIFACT_PATH)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        checksum = export_from_pickle(args.pickle_path, args.artifact_path)
+        print(f"Exported {args.pickle_path} -> {args.artifact_path} (sha256 {checksum})")
+    else:
+        model = load_artifact(args.artifact_path)
+        print(f"Version:   {model.version}")
+        print(f"Intercept: {model.intercept!r}")
+        for name, coef in zip(model.term_names, model.coef.tolist()):
+            print(f"{name:>12}: {coef!r}")
+        if model.transform is not None:
+            print("Transforms left after folding:")
+            for step in model.transform.steps:
+                print(f"  {canonical_json(step)}")
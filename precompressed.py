@@ -0,0 +1,85 @@
+import gzip
+import hashlib
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; pages are then served gzip or identity
+    brotli = None
+
+CACHE_CONTROL = "public, max-age=300"
+
+
+def parse_accept_encoding(header):
+    """Return (accepted, refused): the content codings listed with a non-zero q-value and with q=0"""
+    accepted, refused = set(), set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        (accepted if q > 0 else refused).add(coding)
+    return accepted, refused
+
+
+class PrecompressedPage:
+    """An HTML page rendered once, kept as identity, gzip and brotli bytes
+
+    Each encoding has its own strong ETag, so conditional requests can be
+    answered with 304 without touching the body.
+    """
+
+    __slots__ = ("variants",)
+
+    def __init__(self, html):
+        body = html.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:20]
+
+        # Ordered by preference when the client accepts several
+        variants = []
+        if brotli is not None:
+            variants.append(("br", brotli.compress(body, quality=11), f'"{digest}-br"'))
+        variants.append(("gzip", gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"'))
+        variants.append((None, body, f'"{digest}"'))
+        self.variants = tuple(variants)
+
+    def select(self, accept_encoding):
+        """Pick the (encoding, body, etag) variant for an Accept-Encoding header
+
+        ``*`` only stands for codings the header does not list, so
+        ``br;q=0, *`` still refuses brotli.
+        """
+        accepted, refused = parse_accept_encoding(accept_encoding) if accept_encoding else (set(), set())
+        for variant in self.variants:
+            encoding = variant[0]
+            if encoding is None or encoding in accepted or ("*" in accepted and encoding not in refused):
+                return variant
+        return self.variants[-1]
+
+    def response(self, request):
+        """Build the response for a request, honouring If-None-Match"""
+        encoding, body, etag = self.select(request.headers.get("accept-encoding", ""))
+        headers = {
+            "ETag": etag,
+            "Cache-Control": CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            if "*" in tags or etag in tags or f"W/{etag}" in tags:
+                return Response(status_code=304, headers=headers)
+
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="text/html", headers=headers)
@@ -0,0 +1,24 @@
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GUNICORN_CONFIG = os.path.join(BASE_DIR, "gunicorn.conf.py")
+
+
+def run(app_path):
+    """Serve app_path ("module:app") on $PORT with $WEB_CONCURRENCY workers
+
+    A single worker runs plain uvicorn. More workers run under gunicorn with
+    the app preloaded before forking (see gunicorn.conf.py); uvicorn's own
+    --workers spawns fresh interpreters that would each load their own copy.
+    """
+    port = int(os.environ.get("PORT", 10000))
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    if workers > 1:
+        os.execv(sys.executable, [
+            sys.executable, "-m", "gunicorn", "-c", GUNICORN_CONFIG, "--chdir", BASE_DIR, app_path,
+        ])
+
+    import uvicorn
+
+    uvicorn.run(app_path, host="0.0.0.0", port=port, reload=False)
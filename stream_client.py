@@ -0,0 +1,109 @@
+"""Client for /predict/stream that uploads the body while reading the results
+
+The server answers each chunk of rows while the rest of the body is still
+arriving, so a client has to read the response while it uploads. curl does.
+requests and httpx send the whole body first; once the unread results fill
+the socket buffers, client and server each wait for the other and the
+request times out. This helper uploads from a background thread with
+chunked transfer encoding while the caller iterates over result lines:
+
+    python stream_client.py http://localhost:8000/predict/stream rows.csv > predictions.csv
+
+or from Python:
+
+    for line in stream_predict(url, iter_file("rows.ndjson")):
+        print(json.loads(line)["prediction"])
+
+Only the standard library is needed.
+"""
+import argparse
+import http.client
+import socket
+import sys
+import threading
+import urllib.parse
+
+CHUNK_BYTES = 1 << 16
+
+
+class StreamRequestError(Exception):
+    """Raised when /predict/stream answers with an error status, e.g. 422 for a bad first chunk"""
+
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+def iter_file(path, chunk_bytes=CHUNK_BYTES):
+    """Yield a file's bytes in chunks"""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                return
+            yield chunk
+
+
+def stream_predict(url, chunks, content_type="application/x-ndjson", timeout=60):
+    """POST an iterable of byte chunks to url and yield the result lines as they arrive
+
+    Lines are bytes without their newline: the CSV header and predictions,
+    or NDJSON records. A stream that fails after it started ends with an
+    error line, as described in the README.
+    """
+    parts = urllib.parse.urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    connection = connection_class(parts.netloc, timeout=timeout)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    connection.putrequest("POST", path)
+    connection.putheader("Content-Type", content_type)
+    connection.putheader("Transfer-Encoding", "chunked")
+    connection.endheaders()
+    # Kept here because the connection drops its socket once a response says it will close
+    sock = connection.sock
+
+    def upload():
+        try:
+            for chunk in chunks:
+                if chunk:
+                    sock.sendall(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            sock.sendall(b"0\r\n\r\n")
+        except OSError:
+            # The server stopped reading (a rejected first chunk, or an error line
+            # ending the stream); the response says why
+            pass
+
+    sender = threading.Thread(target=upload, name="stream-upload", daemon=True)
+    sender.start()
+    try:
+        response = connection.getresponse()
+        if response.status != 200:
+            raise StreamRequestError(response.status, response.read().decode("utf-8", "replace"))
+        for line in response:
+            yield line.rstrip(b"\r\n")
+    finally:
+        # Unblocks the sender if it is still waiting on the server
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        connection.close()
+        sender.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV or NDJSON file with /predict/stream")
+    parser.add_argument("url", help="e.g. http://localhost:8000/predict/stream")
+    parser.add_argument("input", help="CSV or NDJSON file")
+    parser.add_argument("--content-type", help="Defaults from the file extension")
+    parser.add_argument("--timeout", type=float, default=60, help="Socket timeout in seconds")
+    args = parser.parse_args()
+
+    content_type = args.content_type or ("text/csv" if args.input.endswith(".csv") else "application/x-ndjson")
+    out = sys.stdout.buffer
+    try:
+        for line in stream_predict(args.url, iter_file(args.input), content_type, args.timeout):
+            out.write(line + b"\n")
+    except StreamRequestError as e:
+        sys.exit(str(e))
@@ -0,0 +1,237 @@
+import io
+import json
+import logging
+
+import numpy as np
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+
+from executor import ExecutorFull
+from fast_json import dumps
+from validation import ValidationFailed
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_MEDIA_TYPES = ("text/csv", "application/csv")
+# Longest accepted input line; a feature row is well under 1 KiB
+MAX_LINE_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """StreamingResponse that can be fed from the request body while it arrives
+
+    Starlette's StreamingResponse listens on ``receive`` for a disconnect
+    while streaming, which would swallow request body messages. This
+    variant leaves ``receive`` to the body reader, and instead notices a
+    disconnect when reading the body raises ClientDisconnect or sending
+    fails. It then closes the body iterator and returns; there is nobody
+    left to answer.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            })
+            async for chunk in self.body_iterator:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except (ClientDisconnect, OSError):
+            logger.info("Client disconnected during %s %s", scope.get("method"), scope.get("path"))
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+async def iter_lines(byte_stream, max_line_bytes=MAX_LINE_BYTES):
+    """Yield complete, non-empty lines from an async stream of byte chunks
+
+    Raises ValidationFailed for a line longer than ``max_line_bytes``, so a
+    body without newlines is rejected instead of buffered whole.
+    """
+    partial = bytearray()
+    async for chunk in byte_stream:
+        if not chunk:
+            continue
+        # Only the new bytes can hold a newline; the partial line has none
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            partial += chunk
+        else:
+            lines = (bytes(partial) + chunk[:end]).split(b"\n")
+            partial = bytearray(chunk[end + 1:])
+            for line in lines:
+                if len(line) > max_line_bytes:
+                    raise _line_too_long(max_line_bytes)
+                line = line.strip()
+                if line:
+                    yield line
+        if len(partial) > max_line_bytes:
+            raise _line_too_long(max_line_bytes)
+    line = bytes(partial).strip()
+    if line:
+        yield line
+
+
+def parse_ndjson_chunk(lines, feature_names):
+    """Parse NDJSON lines (arrays or objects keyed by feature name) into a matrix
+
+    Raises ValueError for a malformed line, including any value that is not a
+    JSON number.
+    """
+    n_features = len(feature_names)
+    X = np.empty((len(lines), n_features), dtype=np.float64)
+    for i, line in enumerate(lines):
+        record = json.loads(line)
+        if isinstance(record, dict):
+            try:
+                record = [record[name] for name in feature_names]
+            except KeyError as e:
+                raise ValueError(f"Record is missing feature {e.args[0]!r}") from None
+        if len(record) != n_features:
+            raise ValueError(f"Expected {n_features} features, got {len(record)}")
+        # float() would also take "3.5" and true; only JSON numbers are features
+        for name, value in zip(feature_names, record):
+            if type(value) not in (int, float):
+                raise ValueError(f"{name}={value!r} is not a number")
+        X[i] = record
+    return X
+
+
+def parse_csv_chunk(lines, usecols):
+    """Parse CSV lines into a matrix, keeping the feature columns in model order"""
+    return np.loadtxt(
+        io.BytesIO(b"\n".join(lines)), delimiter=",", dtype=np.float64,
+        usecols=usecols, ndmin=2,
+    )
+
+
+def csv_usecols(first_line, feature_names):
+    """Column indices for a CSV, or None if its first line is data rather than a header"""
+    cells = [cell.strip().strip('"') for cell in first_line.decode("utf-8").split(",")]
+    try:
+        [float(cell) for cell in cells]
+        return None
+    except ValueError:
+        pass
+    missing = [name for name in feature_names if name not in cells]
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+    return [cells.index(name) for name in feature_names]
+
+
+def _parse_failed(message):
+    return ValidationFailed([{"loc": ["body"], "msg": message, "type": "value_error.parse"}])
+
+
+def _line_too_long(max_line_bytes):
+    return ValidationFailed([{
+        "loc": ["body"],
+        "msg": f"Line longer than {max_line_bytes} bytes",
+        "type": "value_error.line_too_long",
+    }])
+
+
+def score_chunk(lines, model, feature_names, is_csv, usecols, validator=None, first_row=0):
+    """Parse, validate and score one chunk of lines, returning the encoded output lines
+
+    Raises ValidationFailed for lines that cannot be parsed as well as for
+    rows that fail validation.
+    """
+    try:
+        if is_csv:
+            X = parse_csv_chunk(lines, usecols)
+        else:
+            X = parse_ndjson_chunk(lines, feature_names)
+    except (ValueError, TypeError) as e:
+        raise _parse_failed(str(e)) from e
+    if validator is not None:
+        validator.check_matrix(X, loc=("body",), row_offset=first_row)
+
+    predictions = model.predict_matrix(X)
+    if is_csv:
+        return "".join([f"{p!r}\n" for p in predictions.tolist()]).encode("utf-8")
+    return b"".join([b'{"prediction":' + dumps(p) + b"}\n" for p in predictions.tolist()])
+
+
+def error_line(error, first_row, is_csv):
+    """The line that ends a stream whose chunk starting at first_row failed
+
+    NDJSON streams get a JSON record, with the full error details for a
+    ValidationFailed. CSV streams get a single quoted field, so a reader
+    expecting numbers fails on it instead of misreading it.
+    """
+    if is_csv:
+        message = f"error: {error} (chunk starting at row {first_row})".replace('"', '""')
+        return f'"{message}"\n'.encode("utf-8")
+    details = error.to_dict() if isinstance(error, ValidationFailed) else {}
+    return dumps({"error": str(error), "first_row": first_row, **details}) + b"\n"
+
+
+async def _take(lines, n):
+    """Up to n lines from an async line iterator; fewer only at the end of the body"""
+    chunk = []
+    async for line in lines:
+        chunk.append(line)
+        if len(chunk) >= n:
+            break
+    return chunk
+
+
+async def stream_predictions(byte_stream, model, feature_names, is_csv, chunk_rows, executor,
+                             validator=None):
+    """Score a line-delimited body chunk by chunk on a BoundedExecutor
+
+    The CSV header and the first chunk are read and scored before this
+    returns, so input that is invalid from the start raises ValidationFailed
+    (a 422), and a saturated executor raises ExecutorFull (a 503), before
+    any response is sent. Returns an async iterator over the output: a
+    header line for CSV, then each chunk's results as they finish. Only one
+    chunk of input lines is held in memory at a time. A later chunk that
+    fails, or finds the executor full, ends the stream with an ``error_line``.
+    """
+    lines = iter_lines(byte_stream)
+    usecols = list(range(len(feature_names)))
+    first_chunk = []
+    if is_csv:
+        first_line = await anext(lines, None)
+        if first_line is not None:
+            try:
+                header_cols = csv_usecols(first_line, feature_names)
+            except ValueError as e:
+                raise _parse_failed(str(e)) from e
+            if header_cols is None:
+                first_chunk.append(first_line)
+            else:
+                usecols = header_cols
+    first_chunk += await _take(lines, chunk_rows - len(first_chunk))
+
+    def score(chunk, first_row):
+        return executor.run(
+            score_chunk, chunk, model, feature_names, is_csv, usecols, validator, first_row
+        )
+
+    first_output = await score(first_chunk, 0) if first_chunk else b""
+
+    async def output():
+        if is_csv:
+            yield b"prediction\n"
+        yield first_output
+        first_row = len(first_chunk)
+        while True:
+            try:
+                chunk = await _take(lines, chunk_rows)
+                if not chunk:
+                    return
+                result = await score(chunk, first_row)
+            except (ValidationFailed, ExecutorFull) as e:
+                yield error_line(e, first_row, is_csv)
+                return
+            yield result
+            first_row += len(chunk)
+
+    return output()
@@ -28,5 +28,22 @@ def test_api():
     except Exception as e:
         print(f"❌ Prediction failed: {e}")
 
+    # Test batch prediction endpoint
+    batch_data = {
+        "rows": [
+            [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23],
+            [8.3014, 21.0, 6.24, 0.97, 2401, 2.11, 37.86, -122.22]
+        ]
+    }
+
+    try:
+        response = requests.post(f"{base_url}/predict/batch", json=batch_data)
+        result = response.json()
+        print(f"✅ Batch prediction: {result['count']} rows")
+        for prediction in result['predictions']:
+            print(f"   ${prediction:,.2f}")
+    except Exception as e:
+        print(f"❌ Batch prediction failed: {e}")
+
 if __name__ == "__main__":
     test_api()
\ No newline at end of file
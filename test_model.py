@@ -0,0 +1,847 @@
+import asyncio
+import gzip
+import io
+import json
+import math
+import os
+import random
+import struct
+import sys
+import tarfile
+import threading
+import types
+import zlib
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+
+import fast_json
+import wire_format
+from app_factory import AppConfig, create_app
+from batch_score import score_file
+from comparables import (
+    CAL_HOUSING_MEMBER, KM_PER_DEGREE, LEAF_SIZE, ComparablesIndex, KDTreeIndex, build_reference,
+    clustered_points, load_reference, save_reference,
+)
+from executor import BoundedExecutor, ExecutorFull
+from heatmap import PERCENTILE_STEP, TILE_SIZE, TileRenderer, tiles_covering_range
+from lazy_app import LazyASGIApp
+from microbatch import MicroBatcher
+from model import LinearModel
+from model_registry import (
+    DEFAULT_ARTIFACT_PATH, ModelArtifactError, ModelRegistry, load_artifact, save_artifact,
+)
+from precompressed import PrecompressedPage, brotli
+from prediction_cache import PredictionCache
+from streaming import MAX_LINE_BYTES, BodyStreamingResponse, iter_lines, stream_predictions
+from validation import FEATURE_RANGES, FeatureValidator, ValidationFailed
+
+FEATURE_NAMES = [
+    'MedInc', 'HouseAge', 'AveRooms', 'AveBedrms',
+    'Population', 'AveOccup', 'Latitude', 'Longitude'
+]
+
+@pytest.fixture
+def current_event_loop():
+    """A fresh current event loop, closed and swapped for the previous one afterwards
+
+    The requests-based TestClient of the pinned Starlette runs lifespan events
+    on the current event loop, which an earlier test's asyncio.run() leaves unset.
+    """
+    try:
+        previous = asyncio.get_event_loop()
+    except RuntimeError:
+        previous = None
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(previous)
+    loop.close()
+
+def test_scalar_path_matches_numpy_path():
+    rng = random.Random(0)
+    model = LinearModel([rng.uniform(-1, 1) for _ in range(8)], rng.uniform(-1, 1), FEATURE_NAMES)
+
+    rows = [[rng.uniform(-1, 1) * rng.choice([1e-3, 1.0, 1e3]) for _ in range(8)] for _ in range(10000)]
+    for row in rows:
+        assert model.predict_scalar(row) == model.predict_row(np.array(row))
+    # The matrix path uses BLAS, whose summation order can differ in the last bits
+    batch = model.predict_matrix(np.array(rows))
+    scalar = [model.predict_scalar(row) for row in rows]
+    np.testing.assert_allclose(batch, scalar, rtol=1e-12, atol=1e-6)
+    np.testing.assert_allclose(model.predict_matrix(np.array(rows[:7])), batch[:7], rtol=1e-12, atol=1e-6)
+
+def test_scalar_path_matches_numpy_path_for_other_widths():
+    rng = random.Random(1)
+    for n_features in (3, 13, 150):
+        names = [f"f{i}" for i in range(n_features)]
+        model = LinearModel([rng.uniform(-1, 1) for _ in range(n_features)], 0.5, names)
+        rows = [[rng.uniform(-1e3, 1e3) for _ in range(n_features)] for _ in range(500)]
+        X = np.array(rows)
+        explained, _ = model.predict_matrix_explained(X)
+        np.testing.assert_allclose(explained, model.predict_matrix(X), rtol=1e-12, atol=1e-6)
+        for row in rows:
+            assert model.predict_scalar(row) == model.predict_row(np.array(row))
+        np.testing.assert_allclose(model.predict_matrix(X), [model.predict_scalar(row) for row in rows],
+                                   rtol=1e-12, atol=1e-6)
+
+def test_predict_dispatches_by_shape(monkeypatch):
+    model = LinearModel([0.5] * 8, 0.1, FEATURE_NAMES)
+    row = [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]
+
+    assert model.predict(row) == model.predict_scalar(row)
+    assert model.predict(np.array([row, row])).shape == (2,)
+
+    # Rows past SCALAR_PATH_MAX_FEATURES go to NumPy whether given as a list or an array
+    wide = LinearModel([0.5] * 20, 0.1, [f"f{i}" for i in range(20)])
+    calls = []
+    monkeypatch.setattr(LinearModel, "predict_row", lambda self, row: calls.append(row) or 0.0)
+    wide.predict(list(range(20)))
+    wide.predict(np.arange(20, dtype=np.float64))
+    assert len(calls) == 2
+
+def test_artifact_round_trip(tmp_path):
+    path = str(tmp_path / "model.npz")
+    save_artifact(path, [0.1 * i for i in range(8)], -3.5, FEATURE_NAMES, version="v1")
+    model = load_artifact(path)
+
+    assert model.coef.tolist() == [0.1 * i for i in range(8)]
+    assert model.intercept == -3.5
+    assert list(model.feature_names) == FEATURE_NAMES
+    assert model.version == "v1"
+
+def test_artifact_checksum_mismatch_is_rejected(tmp_path):
+    path = str(tmp_path / "model.npz")
+    np.savez(
+        path,
+        format_version=np.array(1),
+        coefficients=np.zeros(8),
+        intercept=np.array(0.0),
+        feature_names=np.array(FEATURE_NAMES),
+        checksum=np.array("0" * 64),
+        version=np.array("bad"),
+    )
+    with pytest.raises(ModelArtifactError):
+        load_artifact(path)
+
+def test_registry_reload_swaps_model(tmp_path):
+    path = str(tmp_path / "model.npz")
+    save_artifact(path, [0.0] * 8, 1.0, FEATURE_NAMES, version="v1")
+    registry = ModelRegistry(path)
+    in_flight = registry.current()
+
+    save_artifact(path, [0.0] * 8, 2.0, FEATURE_NAMES, version="v2")
+    previous = registry.reload()
+
+    assert previous is in_flight
+    assert in_flight.version == "v1"
+    assert registry.current().version == "v2"
+    assert registry.current().predict([1.0] * 8) == 200000.0
+
+def test_registry_rejects_different_feature_order(tmp_path):
+    path = str(tmp_path / "model.npz")
+    save_artifact(path, [0.0] * 8, 1.0, FEATURE_NAMES)
+    registry = ModelRegistry(path)
+
+    with pytest.raises(ModelArtifactError):
+        registry.swap(LinearModel([0.0] * 8, 1.0, FEATURE_NAMES[::-1]))
+
+def test_admin_reload_requires_token_and_swaps_model(tmp_path):
+    path = str(tmp_path / "model.npz")
+    row = [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]
+    save_artifact(path, [0.0] * 8, 1.0, FEATURE_NAMES, version="v1")
+    client = TestClient(create_app(AppConfig(artifact_path=path, admin_token="s3cret")))
+    save_artifact(path, [0.0] * 8, 2.0, FEATURE_NAMES, version="v2")
+
+    for headers in ({}, {"X-Admin-Token": "wrong"}, {"X-Admin-Token": "s3cret-but-longer"}, {"X-Admin-Token": "é"}):
+        assert client.post("/admin/model/reload", headers=headers).status_code == 403
+    assert client.post("/predict", json={"data": row}).json()["model_version"] == "v1"
+
+    response = client.post("/admin/model/reload", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.json() == {"model_version": "v2", "previous_version": "v1"}
+    response = client.post("/predict", json={"data": row}).json()
+    assert response["prediction"] == 200000.0 and response["model_version"] == "v2"
+
+    # A broken artifact is refused and the current model keeps serving
+    with open(path, "wb") as f:
+        f.write(b"not an artifact")
+    response = client.post("/admin/model/reload", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 409
+    assert client.post("/predict", json={"data": row}).json()["model_version"] == "v2"
+
+    # Without a configured token the route is closed to everyone
+    closed = TestClient(create_app(AppConfig()))
+    assert closed.post("/admin/model/reload", headers={"X-Admin-Token": ""}).status_code == 403
+
+def test_registry_watcher_picks_up_new_artifacts(tmp_path):
+    path = str(tmp_path / "model.npz")
+    save_artifact(path, [0.0] * 8, 1.0, FEATURE_NAMES, version="v1")
+    registry = ModelRegistry(path)
+    swapped = threading.Event()
+    registry.add_swap_listener(lambda model, previous: swapped.set())
+
+    def rewrite(write):
+        swapped.clear()
+        write()
+        # Move the mtime on explicitly; rewrites within one clock tick may not change it
+        stamp = os.stat(path).st_mtime_ns + 10 ** 9
+        os.utime(path, ns=(stamp, stamp))
+
+    registry.start_watching(interval=0.01)
+    try:
+        rewrite(lambda: save_artifact(path, [0.0] * 8, 2.0, FEATURE_NAMES, version="v2"))
+        assert swapped.wait(5)
+        assert registry.current().version == "v2"
+
+        # A broken artifact is skipped, and the next good one still gets picked up
+        def write_garbage():
+            with open(path, "wb") as f:
+                f.write(b"half-written")
+        rewrite(write_garbage)
+        assert not swapped.wait(0.2)
+        assert registry.current().version == "v2"
+        rewrite(lambda: save_artifact(path, [0.0] * 8, 3.0, FEATURE_NAMES, version="v3"))
+        assert swapped.wait(5)
+        assert registry.current().version == "v3"
+    finally:
+        registry.stop_watching()
+    assert registry._watcher is None
+
+def test_micro_batcher_scores_each_row_with_its_model():
+    old_model = LinearModel([1.0] * 8, 0.0, FEATURE_NAMES, version="old")
+    new_model = LinearModel([2.0] * 8, 0.0, FEATURE_NAMES, version="new")
+
+    async def run():
+        batcher = MicroBatcher(max_wait=0.001, max_batch_size=16)
+        return await asyncio.gather(
+            batcher.submit(old_model, [1.0] * 8),
+            batcher.submit(new_model, [1.0] * 8),
+            batcher.submit(old_model, [0.5] * 8),
+        )
+
+    assert asyncio.run(run()) == [800000.0, 1600000.0, 400000.0]
+
+def test_prediction_cache_lru_and_invalidation():
+    model = LinearModel([1.0] * 8, 0.0, FEATURE_NAMES)
+    cache = PredictionCache(maxsize=2, ttl=60)
+
+    cache.put(model, [1.0] * 8, 1.0)
+    cache.put(model, [2.0] * 8, 2.0)
+    assert cache.get(model, [1.0] * 8) == 1.0
+    cache.put(model, [3.0] * 8, 3.0)
+
+    assert cache.get(model, [2.0] * 8) is None
+    # Keys are exact: equal values hit whatever their type, nearby ones miss
+    assert cache.get(model, [1] * 8) == 1.0
+    assert cache.get(model, [1.0 + 1e-9] * 8) is None
+    assert cache.evictions == 1
+
+    cache.clear()
+    assert cache.get(model, [1.0] * 8) is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_batch_score_keeps_row_order_across_chunks_and_formats(tmp_path):
+    model = load_artifact(DEFAULT_ARTIFACT_PATH)
+    rng = np.random.default_rng(5)
+    X = np.column_stack([rng.uniform(*FEATURE_RANGES[name], 1000) for name in FEATURE_NAMES])
+    expected = model.predict_matrix(X)
+
+    np.save(tmp_path / "rows.npy", X)
+    X.astype("<f8").tofile(tmp_path / "rows.f64")
+    # Header lists the features out of order, with an extra column to ignore
+    order = FEATURE_NAMES[::-1]
+    with open(tmp_path / "rows.csv", "w") as f:
+        f.write(",".join(order + ["county"]) + "\n")
+        for row in X.tolist():
+            f.write(",".join(repr(row[FEATURE_NAMES.index(name)]) for name in order) + ",x\n")
+    (tmp_path / "columns").mkdir()
+    for j, name in enumerate(FEATURE_NAMES):
+        np.save(tmp_path / "columns" / f"{name}.npy", np.ascontiguousarray(X[:, j]))
+
+    for source in ("rows.npy", "rows.f64", "rows.csv", "columns"):
+        for output in ("out.npy", "out.csv"):
+            out_path = str(tmp_path / output)
+            # 1000 rows in chunks of 64, so results from 2 workers must be put back in order
+            assert score_file(str(tmp_path / source), out_path, workers=2, chunk_rows=64) == 1000
+            if output == "out.npy":
+                predictions = np.load(out_path)
+            else:
+                predictions = np.loadtxt(out_path, skiprows=1)
+            np.testing.assert_allclose(predictions, expected, rtol=1e-12)
+
+def test_wire_format_round_trip():
+    X = np.arange(24, dtype=np.float32).reshape(3, 8)
+    body = wire_format.encode_matrix(X)
+    assert np.array_equal(wire_format.decode_matrix(body, 8), X)
+
+    with pytest.raises(wire_format.WireFormatError):
+        wire_format.decode_matrix(body[:-1], 8)
+    with pytest.raises(wire_format.WireFormatError):
+        wire_format.decode_matrix(body, 9)
+
+    predictions = wire_format.decode_matrix(wire_format.encode_vector([1.5, 2.5]), 1)
+    assert predictions.ravel().tolist() == [1.5, 2.5]
+
+def test_predict_binary_matches_predict_and_rejects_bad_bodies():
+    client = TestClient(create_app(AppConfig()))
+    rng = np.random.default_rng(3)
+    X = np.column_stack([rng.uniform(*FEATURE_RANGES[name], 5) for name in FEATURE_NAMES])
+    headers = {"Content-Type": wire_format.MEDIA_TYPE}
+
+    for dtype in (np.float64, np.float32):
+        sent = X.astype(dtype)
+        response = client.post("/predict/binary", data=wire_format.encode_matrix(sent), headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == wire_format.MEDIA_TYPE
+        assert response.headers["x-model-version"] == client.app.state.service.registry.current().version
+        predictions = wire_format.decode_matrix(response.content, 1).ravel()
+        # float32 rows are scored as the float64 values they round to
+        expected = [client.post("/predict", json={"data": row}).json()["prediction"]
+                    for row in sent.astype(np.float64).tolist()]
+        np.testing.assert_allclose(predictions, expected, rtol=1e-12)
+
+    body = wire_format.encode_matrix(X)
+    for bad in (b"XXXX" + body[4:], body[:8], body[:-3], body[:4] + b"\x02" + body[5:]):
+        response = client.post("/predict/binary", data=bad, headers=headers)
+        assert response.status_code == 400, bad[:8]
+        assert "detail" in response.json()
+
+    out_of_range = X.copy()
+    out_of_range[2, FEATURE_NAMES.index("Latitude")] = 10.0
+    response = client.post("/predict/binary", data=wire_format.encode_matrix(out_of_range), headers=headers)
+    assert response.status_code == 422
+    assert response.json()["invalid_rows"] == [2]
+
+def test_validator_reports_invalid_rows():
+    validator = FeatureValidator(FEATURE_NAMES)
+    good = [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]
+    X = np.array([good, good, good, good])
+    X[1, 0] = np.nan
+    X[3, 6] = 10.0
+
+    validator.check_row(good)
+    validator.check_matrix(X[[0, 2]])
+    with pytest.raises(ValidationFailed) as excinfo:
+        validator.check_matrix(X, row_offset=100)
+    assert excinfo.value.invalid_rows == [101, 103]
+    assert excinfo.value.error_count == 2
+
+    with pytest.raises(ValidationFailed):
+        validator.check_row(good[:7])
+    with pytest.raises(ValidationFailed) as excinfo:
+        validator.check_row(good[:1] + [None] + good[2:])
+    assert excinfo.value.errors == [{"loc": ["body", "data", 1], "msg": "field required", "type": "value_error.missing"}]
+    with pytest.raises(ValidationFailed):
+        validator.check_row_lengths([good, good[:3]])
+
+def test_lazy_app_builds_once_on_first_request(current_event_loop):
+    builds, started, stopped = [], [], []
+
+    def factory():
+        inner = FastAPI()
+
+        @inner.on_event("startup")
+        def startup():
+            started.append(True)
+
+        @inner.on_event("shutdown")
+        def shutdown():
+            stopped.append(True)
+
+        @inner.get("/")
+        def root():
+            return {"started": bool(started)}
+
+        builds.append(inner)
+        return inner
+
+    app = FastAPI()
+    lazy = LazyASGIApp(factory)
+    app.mount("/ui", lazy)
+    app.add_event_handler("shutdown", lazy.shutdown)
+    with TestClient(app) as client:
+        assert builds == []
+        assert client.get("/ui/").json() == {"started": True}
+        assert client.get("/ui/").json() == {"started": True}
+    assert len(builds) == 1
+    assert stopped == [True]
+
+def test_create_app_attaches_only_requested_frontends():
+    api = TestClient(create_app(AppConfig(prediction_cache_size=0)))
+    assert api.get("/").json()["status"] == "running"
+    assert api.get("/about").status_code == 404
+    assert api.post("/predict?compact=1").json()["prediction"] > 0
+
+    site = TestClient(create_app(AppConfig(frontends=["html"])))
+    assert site.get("/").headers["content-type"].startswith("text/html")
+    assert site.get("/about").status_code == 200
+
+    with pytest.raises(ValueError):
+        create_app(AppConfig(frontends=["react"]))
+
+def test_comparables_match_brute_force_and_endpoint(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 5000
+    X = np.tile([3.0, 20.0, 5.0, 1.0, 1000.0, 3.0, 0.0, 0.0], (n, 1))
+    X[:, 6] = np.concatenate([rng.uniform(32.5, 42.0, n // 2), rng.normal(34.05, 0.02, n - n // 2)])
+    X[:, 7] = np.concatenate([rng.uniform(-124.4, -114.2, n // 2), rng.normal(-118.25, 0.02, n - n // 2)])
+    values = rng.uniform(1e5, 5e5, n)
+    path = str(tmp_path / "reference.npz")
+    save_reference(path, X, values, FEATURE_NAMES)
+
+    index = ComparablesIndex.load(path)
+    for lat, lon in [(34.05, -118.25), (37.7, -122.4), (32.0, -124.5), (42.5, -114.0)]:
+        x_scale = KM_PER_DEGREE * math.cos(math.radians(lat))
+        brute = np.hypot((X[:, 6] - lat) * KM_PER_DEGREE, (X[:, 7] - lon) * x_scale)
+        indices, distances = index.tree.query(lat, lon, 7)
+        assert np.allclose(distances, np.sort(brute)[:7])
+        assert np.allclose(brute[indices], distances)
+
+    client = TestClient(create_app(AppConfig(reference_data_path=path)))
+    response = client.get("/comparables", params={"latitude": 34.05, "longitude": -118.25, "k": 3})
+    comparables = response.json()["comparables"]
+    assert len(comparables) == 3
+    assert comparables[0]["distance_km"] <= comparables[2]["distance_km"]
+    assert set(comparables[0]["features"]) == set(FEATURE_NAMES)
+    assert client.get("/comparables", params={"latitude": 50, "longitude": -118}).status_code == 422
+
+    missing = TestClient(create_app(AppConfig(reference_data_path=str(tmp_path / "none.npz"))))
+    assert missing.get("/comparables", params={"latitude": 34, "longitude": -118}).status_code == 503
+
+def test_kd_tree_matches_brute_force_on_clustered_points():
+    rng = np.random.default_rng(1)
+    for sigma in (None, 0.5, 0.05, 0.001):
+        lat, lon = clustered_points(20000, sigma, seed=2)
+        tree = KDTreeIndex(lat, lon)
+        assert np.diff(tree._leaf_start).max() <= LEAF_SIZE
+        picks = rng.integers(0, len(lat), 20)
+        queries = list(zip(lat[picks] + rng.normal(0, 0.01, 20), lon[picks])) + [(41.9, -114.3), (34.05, -118.25)]
+        for latitude, longitude in queries:
+            x_scale = KM_PER_DEGREE * math.cos(math.radians(latitude))
+            brute = np.hypot((lat - latitude) * KM_PER_DEGREE, (lon - longitude) * x_scale)
+            for k in (1, 10, 100):
+                indices, distances = tree.query(latitude, longitude, k)
+                np.testing.assert_allclose(distances, np.sort(brute)[:k])
+                np.testing.assert_allclose(brute[indices], distances)
+
+    # Fewer points than one leaf, and more requested than there are
+    indices, distances = KDTreeIndex([34.0, 34.1], [-118.0, -118.0]).query(34.0, -118.0, 5)
+    assert indices.tolist() == [0, 1] and distances[0] == 0.0
+
+def test_reference_dataset_builds_from_cal_housing_archive(tmp_path):
+    # Two census blocks in the raw StatLib column order
+    raw = b"-122.23,37.88,41.0,880.0,129.0,322.0,126.0,8.3252,452600.0\n" \
+          b"-118.25,34.05,20.0,1000.0,200.0,1500.0,500.0,3.0,250000.0\n"
+    archive = tmp_path / "cal_housing.tgz"
+    with tarfile.open(archive, "w:gz") as tar:
+        info = tarfile.TarInfo(CAL_HOUSING_MEMBER)
+        info.size = len(raw)
+        tar.addfile(info, io.BytesIO(raw))
+
+    path = str(tmp_path / "reference.npz")
+    assert build_reference(path, archive_path=str(archive)) == 2
+    features, values, names = load_reference(path)
+    assert names == FEATURE_NAMES
+    assert values.tolist() == [452600.0, 250000.0]
+    assert np.allclose(features[0], [8.3252, 41.0, 880 / 126, 129 / 126, 322.0, 322 / 126, 37.88, -122.23])
+
+def test_heatmap_tile_is_a_valid_palette_png(tmp_path):
+    client = TestClient(create_app(AppConfig(tile_cache_dir=str(tmp_path))))
+    x, y = tiles_covering_range(6)[1]
+    response = client.get(f"/tiles/6/{x}/{y}.png")
+    assert response.status_code == 200
+    png = response.content
+
+    chunks, offset = {}, 8
+    while offset < len(png):
+        length, kind = struct.unpack(">I4s", png[offset:offset + 8])
+        data = png[offset + 8:offset + 8 + length]
+        assert struct.unpack(">I", png[offset + 8 + length:offset + 12 + length])[0] == zlib.crc32(kind + data)
+        chunks[kind] = data
+        offset += 12 + length
+    assert struct.unpack(">IIBB", chunks[b"IHDR"][:10]) == (TILE_SIZE, TILE_SIZE, 8, 3)
+    pixels = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(TILE_SIZE, -1)[:, 1:]
+    assert (pixels > 0).any()
+
+    assert len(list(tmp_path.rglob("*.png"))) == 1
+    etag = response.headers["etag"]
+    assert client.get(f"/tiles/6/{x}/{y}.png", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/tiles/6/{x}/{y}.png?percentile=40").status_code == 422
+    assert client.get("/tiles/2/9/0.png").status_code == 404
+
+    # With reference data only multiples of PERCENTILE_STEP are accepted, so the
+    # baselines and tile trees a client can create stay bounded
+    reference = np.random.default_rng(0).uniform(1, 10, (1000, 8))
+    renderer = TileRenderer(str(tmp_path / "ref_tiles"), reference_features=reference, feature_names=FEATURE_NAMES)
+    assert renderer.check_percentile(45.0) == 45
+    with pytest.raises(ValueError):
+        renderer.check_percentile(0.001)
+    model = client.app.state.service.registry.current()
+    for percentile in range(0, 101, PERCENTILE_STEP):
+        renderer.get(model, 6, x, y, percentile)
+    assert len(renderer._baselines) == 100 // PERCENTILE_STEP + 1
+    assert np.allclose(renderer.baseline(50), np.median(reference, axis=0))
+
+    # Tiles held at different baselines never share a cache entry or an ETag
+    training = TileRenderer(str(tmp_path / "ref_tiles"), feature_names=FEATURE_NAMES)
+    assert training.get(model, 6, x, y, 50) != renderer.get(model, 6, x, y, 50)
+    assert training.baseline_id == "training" != renderer.baseline_id
+    assert renderer.baseline_id in renderer._cache_path(model, 6, x, y, 50)
+    assert client.app.state.service.tiles.baseline_id in etag
+
+def test_sweep_matches_single_predictions():
+    client = TestClient(create_app(AppConfig(prediction_cache_size=0)))
+    base = [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]
+    body = client.post("/predict/sweep", json={"data": base, "feature": "HouseAge", "values": [10, 20, 30]}).json()
+    for value, prediction in zip(body["values"], body["predictions"]):
+        row = base[:1] + [value] + base[2:]
+        single = client.post("/predict?compact=1", json={"data": row}).json()["prediction"]
+        assert abs(single - prediction) < 1e-6
+    assert abs(sum(body["contributions"].values()) + body["intercept"] - body["base_prediction"]) < 1e-6
+
+    body = client.post("/predict/sweep", json={"feature": "MedInc", "steps": 11}).json()
+    assert body["values"][0] == 0.0 and body["values"][-1] == 20.0 and len(body["predictions"]) == 11
+
+    response = client.post("/predict/sweep", json={"feature": "Latitude", "values": [35, 50]})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "values", 1]
+    for body, field in [({"start": 30, "stop": 40}, "start"), ({"stop": 50}, "stop")]:
+        response = client.post("/predict/sweep", json={"feature": "Latitude", "steps": 5, **body})
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body", field]
+    assert client.post("/predict/sweep", json={"feature": "Rooms"}).status_code == 422
+
+def test_explain_contributions_sum_to_predictions():
+    model = LinearModel([0.4, 0.01, -0.1, 0.6, 0.0, -0.004, -0.42, -0.43], -37.0, FEATURE_NAMES)
+    X = np.random.default_rng(0).uniform(1, 10, (50, 8))
+    predictions, contributions = model.predict_matrix_explained(X)
+    assert np.allclose(predictions, model.predict_matrix(X), rtol=1e-12)
+    assert np.allclose(contributions.sum(axis=1) + model.intercept * 100000, predictions)
+
+    client = TestClient(create_app(AppConfig()))
+    row = [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]
+    single = client.post("/predict?explain=1&compact=1", json={"data": row}).json()
+    assert abs(sum(single["contributions"]) + single["intercept"] - single["prediction"]) < 0.05
+    assert "contributions" not in client.post("/predict", json={"data": row}).json()
+    assert set(single) == {"prediction", "model_version", "terms", "contributions", "intercept"}
+    full = client.post("/predict?explain=1", json={"data": row}).json()
+    assert full["feature_names"] == FEATURE_NAMES and full["prediction"] == single["prediction"]
+
+    batch = client.post("/predict/batch?explain=1", json={"rows": [row, row]}).json()
+    assert batch["contributions"] == [single["contributions"]] * 2
+    assert abs(batch["predictions"][0] - single["prediction"]) < 1e-6
+
+def test_artifact_transforms_fold_and_match_reference(tmp_path):
+    path = str(tmp_path / "model.npz")
+    rng = np.random.default_rng(3)
+    coef = rng.normal(size=9)
+    steps = [
+        {"op": "clip", "feature": "AveOccup", "min": 0.5, "max": 10},
+        {"op": "log1p", "feature": "Population"},
+        {"op": "ratio", "name": "RoomsPerPerson", "numerator": "AveRooms", "denominator": "AveOccup"},
+    ] + [
+        {"op": "standardize", "feature": name, "mean": 2.0 + j, "std": 1.5}
+        for j, name in enumerate(FEATURE_NAMES + ["RoomsPerPerson"])
+    ]
+    save_artifact(path, coef, 0.7, FEATURE_NAMES, transforms=steps)
+    model = load_artifact(path)
+    assert model.term_names[-1] == "RoomsPerPerson"
+    # Every standardize step comes last for its column, so all of them fold away
+    assert [step["op"] for step in model.transform.steps] == ["clip", "log1p", "ratio"]
+
+    X = rng.uniform(1, 20, (200, 8))
+    T = np.column_stack([X, X[:, 2] / np.clip(X[:, 5], 0.5, 10)])
+    T[:, 5] = np.clip(T[:, 5], 0.5, 10)
+    T[:, 4] = np.log1p(T[:, 4])
+    T = (T - (2.0 + np.arange(9))) / 1.5
+    expected = (T @ coef + 0.7) * 100000
+    assert np.allclose(model.predict_matrix(X), expected, rtol=1e-12)
+    assert np.allclose([model.predict_scalar(row) for row in X.tolist()], expected, rtol=1e-12)
+    assert np.allclose(model.contributions(X).sum(axis=1) + model.intercept * 100000, expected)
+
+    # Affine-only pipelines leave a plain linear model behind
+    save_artifact(path, coef[:8], 0.7, FEATURE_NAMES, transforms=steps[3:11])
+    folded = load_artifact(path)
+    assert folded.transform is None
+    assert np.allclose(folded.predict_matrix(X), ((X - (2.0 + np.arange(8))) / 1.5 @ coef[:8] + 0.7) * 100000)
+
+def test_ratio_with_zero_denominator_scores_its_default(tmp_path):
+    path = str(tmp_path / "model.npz")
+    coef = np.linspace(0.1, 0.9, 10)
+    save_artifact(path, coef, 0.5, FEATURE_NAMES, transforms=[
+        {"op": "ratio", "name": "RoomsPerPerson", "numerator": "AveRooms", "denominator": "AveOccup"},
+        {"op": "ratio", "name": "Crowding", "numerator": "Population", "denominator": "AveOccup", "default": 2.0},
+    ])
+    client = TestClient(create_app(AppConfig(artifact_path=path)))
+    row = [8.3252, 41.0, 6.98, 1.02, 322, 0.0, 37.88, -122.23]
+    expected = (np.dot(row + [0.0, 2.0], coef) + 0.5) * 100000
+
+    single = client.post("/predict?explain=1", json={"data": row})
+    assert single.status_code == 200
+    assert np.isclose(single.json()["prediction"], expected, rtol=1e-12)
+    assert single.json()["contributions"][8:] == [0.0, round(2.0 * coef[9] * 100000, 2)]
+    batch = client.post("/predict/batch", json={"rows": [row, row[:5] + [2.0] + row[6:]]})
+    assert batch.status_code == 200
+    assert np.isclose(batch.json()["predictions"][0], expected, rtol=1e-12)
+    assert np.isfinite(batch.json()["predictions"]).all()
+
+def test_bounded_executor_holds_slots_until_jobs_finish():
+    executor = BoundedExecutor(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        job = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorFull):
+            await executor.run(lambda: None)
+
+        # A cancelled caller does not free the slot while its job still runs
+        job.cancel()
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 1
+        with pytest.raises(ExecutorFull):
+            await executor.run(lambda: None)
+
+        release.set()
+        for _ in range(100):
+            if executor.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await executor.run(lambda: 42) == 42
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    assert executor.in_flight == 0
+
+    # A saturated pool turns batches that would go to it into 503s
+    app = create_app(AppConfig(batch_inline_max_rows=0, batch_workers=1, batch_queue_size=0))
+    client = TestClient(app)
+    row = [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]
+    assert client.post("/predict/batch", json={"rows": [row]}).status_code == 200
+    app.state.service.batch_executor.in_flight = 1
+    response = client.post("/predict/batch", json={"rows": [row]})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_empty_batches_score_to_empty_results():
+    client = TestClient(create_app(AppConfig()))
+    for body in ({"rows": []}, {"columns": {name: [] for name in FEATURE_NAMES}}):
+        for explain in ("0", "1"):
+            response = client.post(f"/predict/batch?explain={explain}", json=body)
+            assert response.status_code == 200, response.text
+            assert response.json()["predictions"] == []
+            assert response.json()["count"] == 0
+
+def test_stream_predictions_chunks_headers_and_errors():
+    model = LinearModel([0.4, 0.01, -0.1, 0.6, 0.0, -0.004, -0.42, -0.43], -37.0, FEATURE_NAMES)
+    validator = FeatureValidator(FEATURE_NAMES)
+    row = [8.3252, 41.0, 6.98, 1.02, 322.0, 2.55, 37.88, -122.23]
+    bad = row[:6] + [10.0, row[7]]
+
+    async def body(chunks):
+        for chunk in chunks:
+            yield chunk
+
+    async def collect_lines(chunks):
+        return [line async for line in iter_lines(body(chunks))]
+
+    scoring_pool = BoundedExecutor(max_workers=1, max_queue=4)
+
+    async def run(chunks, is_csv, executor=scoring_pool, fill_after_first=False):
+        output = await stream_predictions(body(chunks), model, FEATURE_NAMES, is_csv, 2, executor, validator)
+        if fill_after_first:
+            executor.in_flight = executor.capacity
+        return b"".join([part async for part in output]).decode().splitlines()
+
+    # Lines may be split anywhere across body chunks; blank lines are skipped
+    assert asyncio.run(collect_lines([b"1,2\n3", b"4\n\n", b"56"])) == [b"1,2", b"34", b"56"]
+
+    # A line past MAX_LINE_BYTES fails without buffering the rest of the body, up front or mid-stream
+    endless = [b"1" * 4096] * (MAX_LINE_BYTES // 4096 + 1)
+    with pytest.raises(ValidationFailed, match="Line longer than"):
+        asyncio.run(collect_lines(endless))
+    with pytest.raises(ValidationFailed, match="Line longer than"):
+        asyncio.run(run(endless, is_csv=False))
+    ndjson_rows = b"".join(json.dumps(r).encode() + b"\n" for r in [row, row])
+    lines = asyncio.run(run([ndjson_rows] + endless, is_csv=False))
+    assert len(lines) == 3 and json.loads(lines[-1])["detail"][0]["type"] == "value_error.line_too_long"
+
+    # A CSV header selects and reorders the feature columns, extra columns ignored
+    header = ",".join(["id"] + FEATURE_NAMES[::-1])
+    data = "\n".join([header] + [",".join(map(str, [i] + row[::-1])) for i in range(3)]).encode()
+    lines = asyncio.run(run([data[:40], data[40:]], is_csv=True))
+    assert lines[0] == "prediction"
+    np.testing.assert_allclose([float(p) for p in lines[1:]], [model.predict_scalar(row)] * 3, rtol=1e-12)
+
+    # A bad later chunk ends the stream with an error carrying absolute row numbers
+    ndjson = b"".join(json.dumps(r).encode() + b"\n" for r in [row, row, row, bad, row, row])
+    lines = asyncio.run(run([ndjson], is_csv=False))
+    assert len(lines) == 3
+    error = json.loads(lines[-1])
+    assert error["first_row"] == 2 and error["invalid_rows"] == [3]
+    csv_lines = asyncio.run(run([b"\n".join(",".join(map(str, r)).encode() for r in [row, row, bad])], True))
+    assert csv_lines[-1].startswith('"error:') and "row 2" in csv_lines[-1]
+
+    # A pool that fills up mid-stream ends it with an error line; a full one rejects it up front
+    full = BoundedExecutor(max_workers=1, max_queue=0)
+    lines = asyncio.run(run([ndjson], False, executor=full, fill_after_first=True))
+    assert len(lines) == 3 and json.loads(lines[-1])["first_row"] == 2
+    assert "already running or queued" in json.loads(lines[-1])["error"]
+    with pytest.raises(ExecutorFull):
+        asyncio.run(run([ndjson], False, executor=full))
+
+    # A bad first chunk is raised before any output, and served as a 422
+    with pytest.raises(ValidationFailed):
+        asyncio.run(run([json.dumps(bad).encode()], is_csv=False))
+    client = TestClient(create_app(AppConfig()))
+    ndjson_headers = {"Content-Type": "application/x-ndjson"}
+    response = client.post("/predict/stream", data=json.dumps(bad), headers=ndjson_headers)
+    assert response.status_code == 422 and response.json()["invalid_rows"] == [0]
+    response = client.post("/predict/stream", data="a,b\n1,2\n", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 422
+    response = client.post("/predict/stream", data=b"{\"MedInc\": 1}\n", headers=ndjson_headers)
+    assert response.status_code == 422 and "missing feature" in response.text
+    for value in ["3.5", True, None]:
+        record = dict(zip(FEATURE_NAMES, row), HouseAge=value)
+        response = client.post("/predict/stream", data=json.dumps(record), headers=ndjson_headers)
+        assert response.status_code == 422 and "HouseAge" in response.text and "not a number" in response.text
+    response = client.post("/predict/stream", data="\n".join([json.dumps(row)] * 6), headers=ndjson_headers)
+    assert response.status_code == 200
+    served = client.app.state.service.registry.current()
+    np.testing.assert_allclose([json.loads(line)["prediction"] for line in response.text.splitlines()],
+                               [served.predict(row)] * 6, rtol=1e-12)
+
+    # Chunks share the batch pool, so a saturated pool gets the same 503 as /predict/batch
+    pool = client.app.state.service.batch_executor
+    pool.in_flight = pool.capacity
+    response = client.post("/predict/stream", data=json.dumps(row), headers=ndjson_headers)
+    assert response.status_code == 503 and response.headers["retry-after"] == "1"
+    pool.in_flight = 0
+
+def test_body_streaming_response_stops_quietly_on_disconnect():
+    async def run(body, fail_send_after=None):
+        closed, sent = [], []
+
+        async def output():
+            try:
+                async for chunk in body():
+                    yield chunk
+            finally:
+                closed.append(True)
+
+        async def send(message):
+            if fail_send_after is not None and len(sent) >= fail_send_after:
+                raise OSError("connection reset")
+            sent.append(message)
+
+        await BodyStreamingResponse(output())({"type": "http", "method": "POST", "path": "/"}, None, send)
+        return closed, [m.get("body") for m in sent[1:]]
+
+    async def body_disconnects():
+        yield b"1\n"
+        raise ClientDisconnect()
+
+    async def body_ok():
+        for chunk in (b"1\n", b"2\n", b"3\n"):
+            yield chunk
+
+    assert asyncio.run(run(body_disconnects)) == ([True], [b"1\n"])
+    assert asyncio.run(run(body_ok, fail_send_after=2)) == ([True], [b"1\n"])
+    assert asyncio.run(run(body_ok)) == ([True], [b"1\n", b"2\n", b"3\n", b""])
+
+def test_html_pages_negotiate_encoding_and_etags():
+    page = PrecompressedPage("<html>hello</html>")
+    assert page.select("gzip;q=0, identity")[0] is None
+    assert page.select("gzip, deflate")[0] == "gzip"
+    assert gzip.decompress(page.select("gzip")[1]) == b"<html>hello</html>"
+    if brotli is not None:
+        assert page.select("gzip, br")[0] == "br"
+        assert page.select("*")[0] == "br"
+        assert page.select("br;q=0, *")[0] == "gzip"
+    assert page.select("gzip;q=0, *")[0] == ("br" if brotli is not None else None)
+    assert page.select("br;q=0, gzip;q=0, *")[0] is None
+
+    client = TestClient(create_app(AppConfig(frontends=("html",))))
+    plain = client.get("/about", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200 and "content-encoding" not in plain.headers
+    gzipped = client.get("/about", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+    assert gzipped.text == plain.text
+    assert gzipped.headers["etag"] != plain.headers["etag"]
+
+    # Each encoding's ETag only matches that encoding
+    etag = gzipped.headers["etag"]
+    revalidated = client.get("/about", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    other = client.get("/about", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert other.status_code == 200
+    assert client.get("/about", headers={"If-None-Match": "*"}).status_code == 304
+
+def test_fast_json_matches_default_predict_response(monkeypatch):
+    default = TestClient(create_app(AppConfig()))
+    fast = TestClient(create_app(AppConfig(fast_json=True)))
+    rows = [
+        [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23],
+        [1.5, 5, 3.1, 1.0, 15000.5, 1.25, 32.5, -124.1],
+    ]
+    # With orjson when it is installed, then with the standard library fallback
+    for orjson in (fast_json.orjson, None):
+        monkeypatch.setattr(fast_json, "orjson", orjson)
+        for row in rows:
+            for path in ("/predict", "/predict?compact=1"):
+                expected = default.post(path, json={"data": row})
+                response = fast.post(path, json={"data": row})
+                assert response.status_code == expected.status_code == 200
+                assert response.headers["content-type"] == "application/json"
+                assert response.json() == expected.json()
+
+def test_metrics_exposition_and_route_labels(monkeypatch, tmp_path, current_event_loop):
+    # Stand-in for the gradio UI, so the mount is exercised without importing gradio
+    def create_gradio_app(predict, validator):
+        ui = FastAPI()
+        ui.get("/")(lambda: {"ui": True})
+        return ui
+
+    monkeypatch.setitem(sys.modules, "gradio_ui", types.SimpleNamespace(create_gradio_app=create_gradio_app))
+    app = create_app(AppConfig(frontends=("gradio",), tile_cache_dir=str(tmp_path)))
+    # Entered, so that shutdown also stops the lazily built UI
+    with TestClient(app) as client:
+        x, y = tiles_covering_range(6)[1]
+        assert client.post("/predict", json={"data": [8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]}).status_code == 200
+        assert client.post("/predict/batch", json={"rows": [[8.3252, 41.0, 6.98, 1.02, 322, 2.55, 37.88, -122.23]] * 3}).status_code == 200
+        assert client.get(f"/tiles/6/{x}/{y}.png").status_code == 200
+        assert client.get(f"/tiles/6/{x}/{y}.png?percentile=40").status_code == 422
+        assert client.get("/gradio/").json() == {"ui": True}
+        assert client.get("/no/such/page").status_code == 404
+        assert client.request("PROPFIND", "/no/such/page").status_code == 404
+
+        response = client.get("/metrics")
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    samples = {}
+    for line in response.text.splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+
+    worker = f'worker="{os.getpid()}"'
+    for route, method, status in [
+        ("/predict", "POST", "200"), ("/predict/batch", "POST", "200"), ("/tiles", "GET", "200"),
+        ("/tiles", "GET", "422"), ("/gradio", "GET", "200"), ("other", "GET", "404"),
+        ("other", "other", "404"),
+    ]:
+        assert samples[f'http_requests_total{{{worker},route="{route}",method="{method}",status="{status}"}}'] == 1
+    assert samples[f'http_request_duration_seconds_count{{{worker},route="/tiles"}}'] == 2
+    assert samples[f'http_request_duration_seconds_bucket{{{worker},route="/tiles",le="+Inf"}}'] == 2
+    assert not any('route="/tiles/' in name or "PROPFIND" in name for name in samples)
+    assert samples[f'prediction_batch_rows_count{{{worker}}}'] == 1
+    assert samples[f'prediction_batch_rows_sum{{{worker}}}'] == 3
+    assert samples[f'prediction_batch_rows_bucket{{{worker},le="1.0"}}'] == 0
+    assert samples[f'prediction_batch_rows_bucket{{{worker},le="10.0"}}'] == 1
+    version = app.state.service.registry.current().version
+    assert samples[f'model_info{{{worker},version="{version}"}}'] == 1
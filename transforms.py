@@ -0,0 +1,224 @@
+"""Declarative feature transforms stored alongside a model's coefficients
+
+A model artifact may carry a list of steps that turn the raw request
+features into the terms its coefficients apply to. Steps run in order, each
+on one named column:
+
+- ``{"op": "standardize", "feature": f, "mean": m, "std": s}``: ``(x - m) / s``
+- ``{"op": "clip", "feature": f, "min": lo, "max": hi}``: either bound may be omitted
+- ``{"op": "log1p", "feature": f}``: ``log(1 + x)``
+- ``{"op": "ratio", "name": new, "numerator": a, "denominator": b, "default": d}``:
+  appends a derived column ``a / b``, e.g. rooms per person from AveRooms /
+  AveOccup. Rows where ``b`` is zero get ``d`` instead (0.0 when omitted), so
+  input the validator accepts never scores to inf or nan
+
+The model's terms are the input features followed by the derived columns, in
+the order the steps create them.
+
+Standardization is affine, so when nothing after it reads or reshapes the
+column, ``compile_pipeline`` folds it into that column's coefficient and the
+intercept at load time and it costs nothing per request. Put standardization
+after clipping and log transforms to get this. The remaining steps run
+vectorized over whole batches, or in plain Python for single rows. The
+Python ``log1p`` (libm) and NumPy's vectorized one can differ in the last bit,
+so single-row and batch predictions of a model with a log step may too.
+"""
+import json
+import math
+
+import numpy as np
+
+STEP_OPS = ("standardize", "clip", "log1p", "ratio")
+
+
+class TransformError(ValueError):
+    """Raised when a transform step list is malformed"""
+
+
+def canonical_json(steps):
+    """The stable serialization of a step list that artifacts store and checksum"""
+    return json.dumps(steps, sort_keys=True, separators=(",", ":"))
+
+
+def _number(step, key, default=None):
+    value = step.get(key, default)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise TransformError(f"Step {step!r}: {key!r} must be a finite number")
+    return float(value)
+
+
+def term_names(steps, feature_names):
+    """Check a step list against the input features and return the model's term names"""
+    names = list(feature_names)
+    for step in steps:
+        if not isinstance(step, dict) or step.get("op") not in STEP_OPS:
+            raise TransformError(f"Unknown transform step {step!r}, expected an op in {STEP_OPS}")
+        if step["op"] == "ratio":
+            for key in ("numerator", "denominator"):
+                if step.get(key) not in names:
+                    raise TransformError(f"Step {step!r}: unknown column {step.get(key)!r}")
+            if not isinstance(step.get("name"), str) or step["name"] in names:
+                raise TransformError(f"Step {step!r}: 'name' must be a new column name")
+            _number(step, "default", 0.0)
+            names.append(step["name"])
+            continue
+        if step.get("feature") not in names:
+            raise TransformError(f"Step {step!r}: unknown column {step.get('feature')!r}")
+        if step["op"] == "standardize":
+            _number(step, "mean", 0.0)
+            if not _number(step, "std", 1.0):
+                raise TransformError(f"Step {step!r}: 'std' must be non-zero")
+        elif step["op"] == "clip":
+            low, high = _number(step, "min"), _number(step, "max")
+            if low is not None and high is not None and low > high:
+                raise TransformError(f"Step {step!r}: 'min' is above 'max'")
+    return names
+
+
+def _log1p(x):
+    # math.log1p raises where np.log1p returns -inf or nan; match NumPy
+    if x > -1.0:
+        return math.log1p(x)
+    return -math.inf if x == -1.0 else math.nan
+
+
+def _divide(a, b, default):
+    return a / b if b else default
+
+
+class FeaturePipeline:
+    """The steps of a transform list that could not be folded away, bound to column indices
+
+    Only the columns the steps write (transformed inputs and derived
+    features) are materialized; ``written`` lists their term indices. Every
+    other term is an input feature read straight from the request.
+    """
+
+    def __init__(self, steps, feature_names):
+        self.steps = list(steps)
+        self.term_names = tuple(term_names(self.steps, feature_names))
+        self.n_inputs = len(feature_names)
+        index = {name: j for j, name in enumerate(self.term_names)}
+
+        targets = [index[step["name"] if step["op"] == "ratio" else step["feature"]] for step in self.steps]
+        self.written = tuple(sorted(set(targets)))
+        position = {j: k for k, j in enumerate(self.written)}
+        # Written inputs start out as copies of the request columns
+        self._copied = [(position[j], j) for j in self.written if j < self.n_inputs]
+
+        def source(name):
+            # ("w", k) reads written column k, ("x", j) reads input column j
+            j = index[name]
+            return ("w", position[j]) if j in position else ("x", j)
+
+        # (op, written column, a, b): the op's parameters, or a ratio's
+        # (numerator, denominator) sources with its default as b
+        self._ops = []
+        for step, j in zip(self.steps, targets):
+            op = step["op"]
+            if op == "standardize":
+                self._ops.append((op, position[j], _number(step, "mean", 0.0), _number(step, "std", 1.0)))
+            elif op == "clip":
+                low, high = _number(step, "min"), _number(step, "max")
+                self._ops.append((op, position[j],
+                                  -math.inf if low is None else low,
+                                  math.inf if high is None else high))
+            elif op == "log1p":
+                self._ops.append((op, position[j], None, None))
+            else:
+                self._ops.append((op, position[j], (source(step["numerator"]), source(step["denominator"])),
+                                  _number(step, "default", 0.0)))
+
+    def apply_written(self, X):
+        """The written columns for a (n_rows, n_inputs) matrix, as float64 (n_rows, len(written))"""
+        # Column-major, so every step works on one contiguous column
+        W = np.empty((X.shape[0], len(self.written)), dtype=np.float64, order="F")
+        for k, j in self._copied:
+            W[:, k] = X[:, j]
+
+        def column(ref):
+            return W[:, ref[1]] if ref[0] == "w" else X[:, ref[1]]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for op, k, a, b in self._ops:
+                out = W[:, k]
+                if op == "standardize":
+                    out -= a
+                    out /= b
+                elif op == "clip":
+                    np.clip(out, a, b, out=out)
+                elif op == "log1p":
+                    np.log1p(out, out=out)
+                else:
+                    denominator = column(a[1])
+                    out.fill(b)
+                    np.divide(column(a[0]), denominator, out=out, where=denominator != 0)
+        return W
+
+    def apply_written_row(self, features):
+        """The written columns for one row as a list of floats, without touching NumPy"""
+        w = [0.0] * len(self.written)
+        for k, j in self._copied:
+            w[k] = float(features[j])
+        for op, k, a, b in self._ops:
+            if op == "standardize":
+                w[k] = (w[k] - a) / b
+            elif op == "clip":
+                w[k] = min(max(w[k], a), b)
+            elif op == "log1p":
+                w[k] = _log1p(w[k])
+            else:
+                numerator, denominator = [w[j] if kind == "w" else float(features[j]) for kind, j in a]
+                w[k] = _divide(numerator, denominator, b)
+        return w
+
+    def apply_matrix(self, X):
+        """All terms for a (n_rows, n_inputs) matrix, as a new float64 (n_rows, n_terms) matrix"""
+        T = np.empty((X.shape[0], len(self.term_names)), dtype=np.float64)
+        T[:, :self.n_inputs] = X
+        T[:, self.written] = self.apply_written(X)
+        return T
+
+
+def compile_pipeline(steps, feature_names, coefficients, intercept):
+    """Fold trailing affine steps into the coefficients
+
+    Returns ``(pipeline, coefficients, intercept)``, where pipeline holds the
+    steps that still have to run per batch, or is None when every step was
+    folded away and the model is plain linear in its inputs.
+    """
+    names = term_names(steps, feature_names)
+    coef = np.array(coefficients, dtype=np.float64)
+    if coef.shape != (len(names),):
+        raise TransformError(f"Expected {len(names)} coefficients for terms {names}, got shape {coef.shape}")
+
+    index = {name: j for j, name in enumerate(names)}
+    # Each term is scale * (its value after the kept steps) + offset
+    scale = np.ones(len(names))
+    offset = np.zeros(len(names))
+    # Columns that a later kept step reads or reshapes; affine steps before it must stay
+    pinned = set()
+    kept = []
+    for step in reversed(steps):
+        op = step["op"]
+        if op == "standardize" and index[step["feature"]] not in pinned:
+            j = index[step["feature"]]
+            mean, std = _number(step, "mean", 0.0), _number(step, "std", 1.0)
+            # scale * ((x - mean) / std) + offset
+            offset[j] -= scale[j] * mean / std
+            scale[j] /= std
+            continue
+        kept.append(step)
+        if op == "ratio":
+            pinned.update((index[step["numerator"]], index[step["denominator"]]))
+        else:
+            pinned.add(index[step["feature"]])
+    kept.reverse()
+
+    intercept = float(intercept) + float(coef @ offset)
+    coef = coef * scale
+    if not kept:
+        return None, coef, intercept
+    return FeaturePipeline(kept, feature_names), coef, intercept
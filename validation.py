@@ -0,0 +1,153 @@
+import math
+
+import numpy as np
+
+# Plausible ranges for each raw feature, a little wider than the California
+# housing training data. Values outside them are almost certainly unit or
+# column-order mistakes, and the linear model extrapolates badly on them.
+FEATURE_RANGES = {
+    'MedInc': (0.0, 20.0),
+    'HouseAge': (0.0, 100.0),
+    'AveRooms': (0.0, 200.0),
+    'AveBedrms': (0.0, 50.0),
+    'Population': (0.0, 50000.0),
+    'AveOccup': (0.0, 1500.0),
+    'Latitude': (32.0, 42.5),
+    'Longitude': (-124.5, -114.0),
+}
+
+# Only this many individual errors are listed in a response; the total is always reported
+MAX_REPORTED_ERRORS = 100
+
+
+class ValidationFailed(Exception):
+    """Raised when input rows fail validation; served as a 422 response
+
+    ``errors`` follow FastAPI's validation error layout (``loc``, ``msg``,
+    ``type``) and ``invalid_rows`` lists the offending row indices.
+    """
+
+    def __init__(self, errors, error_count=None, invalid_rows=None):
+        super().__init__(errors[0]["msg"] if errors else "Invalid input")
+        self.errors = errors
+        self.error_count = len(errors) if error_count is None else error_count
+        self.invalid_rows = invalid_rows
+
+    def to_dict(self):
+        content = {"detail": self.errors, "error_count": self.error_count}
+        if self.invalid_rows is not None:
+            content["invalid_rows"] = self.invalid_rows
+        return content
+
+
+class FeatureValidator:
+    """Checks shape, finiteness and per-feature ranges of single rows and batches"""
+
+    def __init__(self, feature_names, ranges=FEATURE_RANGES):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        bounds = [ranges.get(name, (-math.inf, math.inf)) for name in self.feature_names]
+        self._bounds = bounds
+        self.lower = np.array([low for low, _ in bounds], dtype=np.float64)
+        self.upper = np.array([high for _, high in bounds], dtype=np.float64)
+
+    def _value_error(self, loc, j, value):
+        name = self.feature_names[j]
+        if not math.isfinite(value):
+            return {"loc": loc, "msg": f"{name} must be a finite number", "type": "value_error.not_finite"}
+        low, high = self._bounds[j]
+        return {
+            "loc": loc,
+            "msg": f"{name}={value!r} is outside the plausible range [{low}, {high}]",
+            "type": "value_error.range",
+        }
+
+    def check_row(self, features, loc=("body", "data")):
+        """Validate one row given as a list; cheap enough for every /predict call"""
+        if features is None:
+            raise ValidationFailed([{"loc": list(loc), "msg": "field required", "type": "value_error.missing"}])
+        if len(features) != self.n_features:
+            raise ValidationFailed([{
+                "loc": list(loc),
+                "msg": f"Expected {self.n_features} features, got {len(features)}",
+                "type": "value_error.shape",
+            }])
+
+        errors = []
+        for j, (value, (low, high)) in enumerate(zip(features, self._bounds)):
+            # A cleared form field (the Gradio UI) arrives as None
+            if value is None:
+                errors.append({"loc": [*loc, j], "msg": "field required", "type": "value_error.missing"})
+            elif not low <= value <= high:
+                errors.append(self._value_error([*loc, j], j, value))
+        if errors:
+            raise ValidationFailed(errors)
+
+    def check_value(self, name, value, loc):
+        """Validate a single value of the named feature"""
+        j = self.feature_names.index(name)
+        low, high = self._bounds[j]
+        if not low <= value <= high:
+            raise ValidationFailed([self._value_error(list(loc), j, value)])
+
+    def check_row_lengths(self, rows, loc=("body", "rows")):
+        """Reject a list of rows if any row has the wrong number of features"""
+        n = self.n_features
+        bad = [i for i, row in enumerate(rows) if len(row) != n]
+        if bad:
+            errors = [
+                {
+                    "loc": [*loc, i],
+                    "msg": f"Expected {n} features, got {len(rows[i])}",
+                    "type": "value_error.shape",
+                }
+                for i in bad[:MAX_REPORTED_ERRORS]
+            ]
+            raise ValidationFailed(errors, len(bad), bad[:MAX_REPORTED_ERRORS])
+
+    def check_columns(self, columns, loc=("body", "columns")):
+        """Reject columnar input with missing feature columns or uneven lengths"""
+        errors = [
+            {"loc": [*loc, name], "msg": "field required", "type": "value_error.missing"}
+            for name in self.feature_names if name not in columns
+        ]
+        if not errors:
+            n_rows = len(columns[self.feature_names[0]])
+            errors = [
+                {
+                    "loc": [*loc, name],
+                    "msg": f"Column has {len(columns[name])} values, expected {n_rows}",
+                    "type": "value_error.shape",
+                }
+                for name in self.feature_names if len(columns[name]) != n_rows
+            ]
+        if errors:
+            raise ValidationFailed(errors)
+
+    def check_matrix(self, X, loc=("body", "rows"), row_offset=0):
+        """Validate a whole (n_rows, n_features) matrix in one vectorized pass
+
+        ``row_offset`` is added to reported row indices, for matrices that are
+        one chunk of a larger input.
+        """
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValidationFailed([{
+                "loc": list(loc),
+                "msg": f"Expected shape (n_rows, {self.n_features}), got {X.shape}",
+                "type": "value_error.shape",
+            }])
+
+        # NaN compares False both ways, so it needs the explicit finiteness test
+        bad = ~np.isfinite(X)
+        bad |= X < self.lower
+        bad |= X > self.upper
+        if not bad.any():
+            return
+
+        rows, cols = np.nonzero(bad)
+        errors = [
+            self._value_error([*loc, i + row_offset, j], j, float(X[i, j]))
+            for i, j in zip(rows[:MAX_REPORTED_ERRORS].tolist(), cols[:MAX_REPORTED_ERRORS].tolist())
+        ]
+        invalid_rows = [row + row_offset for row in np.unique(rows)[:MAX_REPORTED_ERRORS].tolist()]
+        raise ValidationFailed(errors, len(rows), invalid_rows)
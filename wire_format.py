@@ -0,0 +1,63 @@
+"""Binary wire format for batch scoring (``application/octet-stream``)
+
+A message is a 16-byte little-endian header followed by a row-major matrix:
+
+    offset  size  field
+    0       4     magic, b"HPF1"
+    4       1     itemsize: 4 for float32, 8 for float64
+    5       1     columns per row (8 features in requests, 1 in responses)
+    6       2     reserved, must be 0
+    8       8     row count (uint64)
+
+The payload is parsed zero-copy with ``np.frombuffer``. The 16-byte header
+keeps float64 data 8-byte aligned.
+"""
+import struct
+
+import numpy as np
+
+MEDIA_TYPE = "application/octet-stream"
+MAGIC = b"HPF1"
+HEADER = struct.Struct("<4sBBHQ")
+DTYPES = {4: np.dtype("<f4"), 8: np.dtype("<f8")}
+
+
+class WireFormatError(ValueError):
+    """Raised when a binary message is malformed"""
+
+
+def decode_matrix(body, n_features):
+    """Return a read-only (n_rows, n_features) view of a binary request body"""
+    if len(body) < HEADER.size:
+        raise WireFormatError(f"Body is shorter than the {HEADER.size}-byte header")
+    magic, itemsize, n_columns, reserved, n_rows = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise WireFormatError(f"Bad magic {magic!r}, expected {MAGIC!r}")
+    if itemsize not in DTYPES:
+        raise WireFormatError(f"Unsupported itemsize {itemsize}, expected 4 or 8")
+    if n_columns != n_features:
+        raise WireFormatError(f"Expected {n_features} features per row, got {n_columns}")
+    if reserved != 0:
+        raise WireFormatError("Reserved header bytes must be 0")
+
+    expected = HEADER.size + n_rows * n_columns * itemsize
+    if len(body) != expected:
+        raise WireFormatError(f"Body has {len(body)} bytes, header implies {expected}")
+
+    X = np.frombuffer(body, dtype=DTYPES[itemsize], count=n_rows * n_columns, offset=HEADER.size)
+    return X.reshape(n_rows, n_columns)
+
+
+def encode_vector(values):
+    """Encode a 1-D array as a float64 binary message with one column"""
+    values = np.ascontiguousarray(values, dtype="<f8")
+    return HEADER.pack(MAGIC, 8, 1, 0, len(values)) + values.tobytes()
+
+
+def encode_matrix(X):
+    """Encode a 2-D float32 or float64 array as a binary request body"""
+    X = np.ascontiguousarray(X)
+    if X.dtype not in (np.float32, np.float64):
+        X = X.astype(np.float64)
+    X = X.astype(X.dtype.newbyteorder("<"), copy=False)
+    return HEADER.pack(MAGIC, X.dtype.itemsize, X.shape[1], 0, X.shape[0]) + X.tobytes()